@@ -0,0 +1,232 @@
+"""Benchmark suite for mask builders and heavy parametric cells.
+
+Times every registered mask and a set of heavy cells with a cold cache (gdsfactory
+cell cache cleared before each run) and a warm cache (run again right away).
+Each run is appended to a JSON Lines history and compared against previous runs
+on the same machine. Runs offline with the locally installed PDK only.
+
+.. code::
+
+    python -m ubc2.benchmark                       # everything
+    python -m ubc2.benchmark -k "cell:*" -r 5      # only cells, best of 5
+    python -m ubc2.benchmark --threshold 1.1       # fail on >10% regressions
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import fnmatch
+import functools
+import importlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from ubc2.config import PATH
+from ubc2.manifest import get_package_versions
+from ubc2.masks import MASKS
+
+# name: (entry point, kwargs)
+CELLS: dict[str, tuple[str, dict[str, Any]]] = {
+    "ring_single_heater": ("ubc2.ubc_simon:ring_single_heater", {}),
+    "rings_proximity": ("ubc2.ubc_simon:rings_proximity", {"num_rings": 9}),
+    "disks_proximity": ("ubc2.ubc_simon:disks_proximity", {"num_rings": 9}),
+    "coupler_asymmetric_full": ("ubc2.ubc_simon_dcs:coupler_asymmetric_full", {}),
+    "continuum_coupling": ("ubc2.ubc_simon_loss:continuum_coupling", {}),
+    "cutback_2x2_cols500": ("ubc2.cutback_2x2:cutback_2x2", {"cols": 500}),
+}
+
+HISTORY = PATH.build / "benchmarks" / "history.jsonl"
+THRESHOLD = 1.25  # regression if slower than baseline * THRESHOLD
+MIN_DELTA = 0.05  # and slower by at least this many seconds
+WINDOW = 5  # baseline is the median of the last WINDOW runs
+
+
+def load(entry_point: str) -> Callable[..., Any]:
+    module_name, function_name = entry_point.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def get_benchmarks() -> dict[str, Callable[[], Any]]:
+    """Returns benchmark name to function, without importing any mask module."""
+    benchmarks: dict[str, Callable[[], Any]] = {}
+    for name in MASKS:
+        benchmarks[f"mask:{name}"] = functools.partial(_run_mask, name)
+    for name, (entry_point, kwargs) in CELLS.items():
+        benchmarks[f"cell:{name}"] = functools.partial(_run_cell, entry_point, kwargs)
+    return benchmarks
+
+
+def _run_mask(name: str) -> None:
+    from ubc2.masks import get_mask
+
+    get_mask(name)()
+
+
+def _run_cell(entry_point: str, kwargs: dict[str, Any]) -> None:
+    load(entry_point)(**kwargs)
+
+
+def time_benchmark(function: Callable[[], Any], repeat: int = 1) -> dict[str, float]:
+    """Returns best cold-cache and warm-cache wall time in seconds."""
+    import gdsfactory as gf
+
+    cold, warm = [], []
+    for _ in range(repeat):
+        gf.clear_cache()
+        t0 = time.perf_counter()
+        function()
+        cold.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        function()
+        warm.append(time.perf_counter() - t0)
+    return dict(cold=min(cold), warm=min(warm))
+
+
+def get_git_commit() -> str | None:
+    try:
+        process = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=PATH.repo,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return process.stdout.strip()
+
+
+def run(pattern: str = "*", repeat: int = 1) -> dict[str, Any]:
+    """Runs benchmarks matching pattern and returns a history record."""
+    import ubcpdk
+
+    ubcpdk.PDK.activate()
+    results: dict[str, dict[str, float]] = {}
+    errors: dict[str, str] = {}
+
+    with tempfile.TemporaryDirectory() as dirpath:
+        # masks write GDS files, keep them out of the build directory
+        PATH.build = Path(dirpath)
+        for name, function in get_benchmarks().items():
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            try:
+                results[name] = time_benchmark(function, repeat=repeat)
+            except Exception as error:
+                errors[name] = repr(error)
+                print(f"{'ERROR':>8s} {'':>8s} {name}: {error!r}")
+                continue
+            timing = results[name]
+            print(f"{timing['cold']:7.3f}s {timing['warm']:7.3f}s {name}")
+
+    return dict(
+        timestamp=datetime.datetime.now().isoformat(timespec="seconds"),
+        commit=get_git_commit(),
+        machine=platform.node(),
+        python=platform.python_version(),
+        versions=get_package_versions(),
+        repeat=repeat,
+        results=results,
+        errors=errors,
+    )
+
+
+def read_history(filepath: Path = HISTORY) -> list[dict[str, Any]]:
+    filepath = Path(filepath)
+    if not filepath.exists():
+        return []
+    return [json.loads(line) for line in filepath.read_text().splitlines() if line]
+
+
+def append_history(record: dict[str, Any], filepath: Path = HISTORY) -> None:
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def find_regressions(
+    record: dict[str, Any],
+    history: list[dict[str, Any]],
+    threshold: float = THRESHOLD,
+    min_delta: float = MIN_DELTA,
+    window: int = WINDOW,
+) -> list[str]:
+    """Compares record against the median of the last runs on the same machine.
+
+    Args:
+        record: new run.
+        history: previous runs.
+        threshold: relative slowdown that counts as a regression.
+        min_delta: absolute slowdown in seconds below which changes are noise.
+        window: number of previous runs used for the baseline.
+    """
+    previous = [r for r in history if r["machine"] == record["machine"]]
+    regressions = []
+    for name, timing in record["results"].items():
+        for kind, value in timing.items():
+            values = [
+                r["results"][name][kind]
+                for r in previous
+                if name in r["results"] and kind in r["results"][name]
+            ][-window:]
+            if not values:
+                continue
+            baseline = statistics.median(values)
+            if value > baseline * threshold and value - baseline > min_delta:
+                regressions.append(
+                    f"{name} ({kind}): {value:.3f}s vs baseline {baseline:.3f}s"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-k", "--select", default="*", help="glob of benchmarks to run, e.g. 'cell:*'"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="keep best of N")
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA)
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument(
+        "--no-save", action="store_true", help="do not append to the history"
+    )
+    parser.add_argument("--list", action="store_true", help="list benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in get_benchmarks():
+            print(name)
+        return 0
+
+    print(f"{'cold':>8s} {'warm':>8s}")
+    record = run(pattern=args.select, repeat=args.repeat)
+    regressions = find_regressions(
+        record,
+        read_history(args.history),
+        threshold=args.threshold,
+        min_delta=args.min_delta,
+        window=args.window,
+    )
+    if not args.no_save:
+        append_history(record, args.history)
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return int(bool(regressions or record["errors"]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
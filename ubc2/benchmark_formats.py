@@ -0,0 +1,180 @@
+"""Compare GDS and OASIS mask files: size, write time and read time.
+
+Builds every registered mask as GDS, then writes and reads the same library as
+GDS and as OASIS (CBLOCK compressed) and checks that both files hold the same
+polygons and labels.
+
+.. code::
+
+    python -m ubc2.benchmark_formats
+    python -m ubc2.benchmark_formats -k "EBeam_heaters_*" -r 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from ubc2.config import MASK_FORMAT_ENV, PATH
+from ubc2.masks import MASKS
+
+
+def best_time(function: Callable[[], Any], repeat: int = 1) -> tuple[float, Any]:
+    """Returns best wall time in seconds and the result of the last call."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def get_summary(library) -> dict[str, Any]:
+    """Returns per cell polygon count, area per layer and labels of a library."""
+    summary = {}
+    for cell in library.cells:
+        areas: dict[str, float] = {}
+        for polygon in cell.polygons:
+            key = f"{polygon.layer}/{polygon.datatype}"
+            areas[key] = areas.get(key, 0) + polygon.area()
+        labels = sorted(
+            (
+                label.text,
+                label.layer,
+                label.texttype,
+                round(label.origin[0], 3),
+                round(label.origin[1], 3),
+            )
+            for label in cell.labels
+        )
+        summary[cell.name] = dict(
+            polygons=len(cell.polygons),
+            paths=len(cell.paths),
+            references=len(cell.references),
+            areas=areas,
+            labels=labels,
+        )
+    return summary
+
+
+def is_equivalent(summary1: dict[str, Any], summary2: dict[str, Any]) -> bool:
+    """Returns True if both summaries have the same cells, labels and areas.
+
+    Areas may differ by float rounding, as the formats store vertices differently.
+    """
+    if summary1.keys() != summary2.keys():
+        return False
+    for name, cell1 in summary1.items():
+        cell2 = summary2[name]
+        areas1, areas2 = cell1["areas"], cell2["areas"]
+        if areas1.keys() != areas2.keys() or any(
+            cell1[key] != cell2[key] for key in cell1 if key != "areas"
+        ):
+            return False
+        if not all(math.isclose(areas1[k], areas2[k], abs_tol=1e-5) for k in areas1):
+            return False
+    return True
+
+
+def compare_formats(gdspath: Path, repeat: int = 1) -> dict[str, Any]:
+    """Returns size and write/read times of gdspath written as GDS and OASIS.
+
+    Args:
+        gdspath: mask written by write_mask_gds_with_metadata.
+        repeat: keep the best of repeat runs.
+    """
+    import gdsfactory as gf
+    import gdstk
+
+    from ubc2.write_mask import oasis_settings
+
+    # same polygon fracturing as the gdsfactory GDS writer
+    max_points = gf.get_active_pdk().gds_write_settings.max_points
+    gdspath = Path(gdspath)
+    library = gdstk.read_gds(gdspath)
+    gds = gdspath.with_name(f"{gdspath.stem}_benchmark.gds")
+    oas = gdspath.with_name(f"{gdspath.stem}_benchmark.oas")
+
+    write_gds, _ = best_time(
+        lambda: library.write_gds(gds, max_points=max_points), repeat
+    )
+    read_gds, library_gds = best_time(lambda: gdstk.read_gds(gds), repeat)
+    write_oas, _ = best_time(lambda: library.write_oas(oas, **oasis_settings), repeat)
+    read_oas, library_oas = best_time(lambda: gdstk.read_oas(oas), repeat)
+
+    return dict(
+        gds=dict(size=gds.stat().st_size, write=write_gds, read=read_gds),
+        oas=dict(size=oas.stat().st_size, write=write_oas, read=read_oas),
+        equivalent=is_equivalent(get_summary(library_gds), get_summary(library_oas)),
+    )
+
+
+def format_row(gds: dict[str, float], oas: dict[str, float], name: str) -> str:
+    return (
+        f"{gds['size'] / 1e6:8.2f} {oas['size'] / 1e6:8.2f} "
+        f"{oas['size'] / gds['size']:6.2f} "
+        f"{gds['write']:9.3f}s {oas['write']:9.3f}s "
+        f"{gds['read']:8.3f}s {oas['read']:8.3f}s {name}"
+    )
+
+
+def run(pattern: str = "*", repeat: int = 1) -> dict[str, dict[str, Any]]:
+    """Builds masks matching pattern and returns their format comparison."""
+    import ubcpdk
+
+    from ubc2.masks import get_mask
+
+    ubcpdk.PDK.activate()
+    os.environ[MASK_FORMAT_ENV] = "gds"
+    results = {}
+    print(
+        f"{'GDS MB':>8s} {'OAS MB':>8s} {'ratio':>6s} "
+        f"{'write GDS':>10s} {'write OAS':>10s} {'read GDS':>9s} {'read OAS':>9s}"
+    )
+    with tempfile.TemporaryDirectory() as dirpath:
+        PATH.build = Path(dirpath)
+        for name in MASKS:
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            result = compare_formats(get_mask(name)(), repeat=repeat)
+            results[name] = result
+            status = "" if result["equivalent"] else "  NOT EQUIVALENT"
+            print(format_row(result["gds"], result["oas"], f"{name}{status}"))
+
+    if results:
+        totals = {
+            kind: {
+                key: sum(r[kind][key] for r in results.values())
+                for key in ("size", "write", "read")
+            }
+            for kind in ("gds", "oas")
+        }
+        print(format_row(totals["gds"], totals["oas"], "total"))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--select", default="*", help="glob of mask names")
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="keep best of N")
+    parser.add_argument("--json", type=Path, default=None, help="write results here")
+    args = parser.parse_args(argv)
+
+    results = run(pattern=args.select, repeat=args.repeat)
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(results, indent=2))
+    return int(not all(result["equivalent"] for result in results.values()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Report the polygons, vertices and references of every cell of built masks.
+
+Counts are taken once per cell (unique, as stored in the file) and for every
+instance of the cell in the mask (flattened, as a DRC or viewer sees it).
+Repetitions (arrays) count once when unique and once per element when
+flattened. A cell is ranked by the flattened vertices it contributes to the
+mask, its own vertices times its instances, which is the cost of writing,
+checking or viewing it. Cells over a budget are flagged::
+
+    ubc2 budget                                       # all masks in build/mask
+    ubc2 budget build/mask/EBeam_simbilod_10.gds --top 10
+    ubc2 budget --budget vertices=50000 --budget flat_vertices=1e6 --json b.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from ubc2.config import MAX_POINTS, PATH
+
+# maximum of each count, per cell
+BUDGETS: dict[str, float] = {
+    # vertices of one polygon, the GDS writer fractures larger polygons
+    "polygon_vertices": MAX_POINTS,
+    # vertices stored in the cell itself
+    "vertices": 100_000,
+    # vertices of the cell flattened, with all its instances
+    "flat_vertices": 1_000_000,
+    # vertices the cell contributes to the flattened mask
+    "contribution": 1_000_000,
+}
+TOP = 20
+
+
+@dataclass
+class Counts:
+    polygons: int = 0
+    vertices: int = 0
+
+    def add(self, other: Counts, times: int = 1) -> None:
+        self.polygons += other.polygons * times
+        self.vertices += other.vertices * times
+
+
+@dataclass
+class CellBudget:
+    """Counts of one cell.
+
+    Args:
+        name: cell name.
+        polygons: polygons and paths stored in the cell.
+        vertices: of those polygons.
+        references: stored in the cell, an array counts once.
+        max_polygon_vertices: of the largest polygon of the cell.
+        instances: of the cell in the flattened mask.
+        expanded: polygons and vertices of the cell, repeated polygons expanded.
+        flat: polygons and vertices of the cell with its dependencies flattened.
+        layers: polygons and vertices stored in the cell, by layer.
+        flat_layers: polygons and vertices of the flattened cell, by layer.
+    """
+
+    name: str
+    polygons: int = 0
+    vertices: int = 0
+    references: int = 0
+    max_polygon_vertices: int = 0
+    instances: int = 0
+    expanded: Counts = field(default_factory=Counts)
+    flat: Counts = field(default_factory=Counts)
+    layers: dict[str, Counts] = field(default_factory=dict)
+    flat_layers: dict[str, Counts] = field(default_factory=dict)
+
+    @property
+    def contribution(self) -> int:
+        """Vertices of this cell, not its dependencies, in the flattened mask."""
+        return self.expanded.vertices * self.instances
+
+    def get_value(self, key: str) -> float:
+        values = {
+            "polygon_vertices": self.max_polygon_vertices,
+            "vertices": self.vertices,
+            "flat_vertices": self.flat.vertices,
+            "contribution": self.contribution,
+        }
+        return values[key]
+
+
+def count_cells(cells: Iterable[Any]) -> dict[str, CellBudget]:
+    """Returns the budget of cells and all their dependencies, by cell name.
+
+    Instances are counted from the top level cells of cells.
+    """
+    from ubc2.reticle import iter_cells
+
+    cells = list(iter_cells(cells))
+    budgets: dict[int, CellBudget] = {}
+
+    # children before parents, so flattened counts only add up child totals
+    for cell in cells:
+        b = budgets[id(cell)] = CellBudget(name=cell.name)
+        polygons = list(cell.polygons)
+        for path in cell.paths:
+            polygons += path.to_polygons()
+        for polygon in polygons:
+            key = f"{polygon.layer}/{polygon.datatype}"
+            counts = Counts(1, polygon.size)
+            b.polygons += 1
+            b.vertices += polygon.size
+            b.max_polygon_vertices = max(b.max_polygon_vertices, polygon.size)
+            b.layers.setdefault(key, Counts()).add(counts)
+            times = polygon.repetition.size or 1
+            b.expanded.add(counts, times)
+            b.flat.add(counts, times)
+            b.flat_layers.setdefault(key, Counts()).add(counts, times)
+
+        b.references = len(cell.references)
+        for reference in cell.references:
+            child = budgets[id(reference.cell)]
+            times = reference.repetition.size or 1
+            b.flat.add(child.flat, times)
+            for key, counts in child.flat_layers.items():
+                b.flat_layers.setdefault(key, Counts()).add(counts, times)
+
+    # parents before children, so instances only add up parent instances
+    parents = {id(cell) for cell in cells}
+    for cell in cells:
+        parents -= {id(child) for child in cell.dependencies(False)}
+    for cell in reversed(cells):
+        b = budgets[id(cell)]
+        b.instances += int(id(cell) in parents)
+        for reference in cell.references:
+            times = reference.repetition.size or 1
+            budgets[id(reference.cell)].instances += b.instances * times
+
+    return {b.name: b for b in budgets.values()}
+
+
+def get_violations(
+    cells: dict[str, CellBudget], budgets: dict[str, float] = BUDGETS
+) -> list[tuple[str, str, float]]:
+    """Returns (cell name, budget name, value) for every count over budget."""
+    return [
+        (b.name, key, b.get_value(key))
+        for b in cells.values()
+        for key, limit in budgets.items()
+        if b.get_value(key) > limit
+    ]
+
+
+def get_layers(
+    cells: dict[str, CellBudget], tops: Iterable[str]
+) -> dict[str, dict[str, int]]:
+    """Returns unique and flattened polygons and vertices of the mask per layer."""
+    layers: dict[str, dict[str, int]] = {}
+
+    def get_layer(key: str) -> dict[str, int]:
+        return layers.setdefault(
+            key, dict(polygons=0, vertices=0, flat_polygons=0, flat_vertices=0)
+        )
+
+    for b in cells.values():
+        for key, counts in b.layers.items():
+            get_layer(key)["polygons"] += counts.polygons
+            get_layer(key)["vertices"] += counts.vertices
+    for name in tops:
+        for key, counts in cells[name].flat_layers.items():
+            get_layer(key)["flat_polygons"] += counts.polygons
+            get_layer(key)["flat_vertices"] += counts.vertices
+    return dict(sorted(layers.items(), key=lambda item: -item[1]["flat_vertices"]))
+
+
+def get_report(filepath: Path, budgets: dict[str, float] = BUDGETS) -> dict[str, Any]:
+    """Returns the budget of every cell and layer of a mask file."""
+    from ubc2.reticle import read_library
+
+    library = read_library(filepath)
+    tops = library.top_level()
+    cells = count_cells(tops)
+    ranked = sorted(cells.values(), key=lambda b: -b.contribution)
+    return dict(
+        filepath=str(filepath),
+        cells=len(cells),
+        polygons=sum(b.polygons for b in cells.values()),
+        vertices=sum(b.vertices for b in cells.values()),
+        flat_polygons=sum(cells[cell.name].flat.polygons for cell in tops),
+        flat_vertices=sum(cells[cell.name].flat.vertices for cell in tops),
+        layers=get_layers(cells, [cell.name for cell in tops]),
+        ranked=[dict(asdict(b), contribution=b.contribution) for b in ranked],
+        budgets=budgets,
+        violations=get_violations(cells, budgets),
+    )
+
+
+def print_report(report: dict[str, Any], top: int = TOP) -> None:
+    print(
+        f"{report['filepath']}: {report['cells']} cells, "
+        f"{report['polygons']} polygons / {report['vertices']} vertices unique, "
+        f"{report['flat_polygons']} / {report['flat_vertices']} flattened"
+    )
+    total = report["flat_vertices"] or 1
+    print(
+        f"  {'cell':48s} {'vertices':>9s} {'instances':>9s} {'flat':>10s} "
+        f"{'contrib':>10s} {'share':>6s}"
+    )
+    for b in report["ranked"][:top]:
+        print(
+            f"  {b['name'][:48]:48s} {b['vertices']:9d} {b['instances']:9d} "
+            f"{b['flat']['vertices']:10d} {b['contribution']:10d} "
+            f"{b['contribution'] / total:6.1%}"
+        )
+    print(f"  {'layer':48s} {'vertices':>9s} {'flat':>10s}")
+    for key, layer in list(report["layers"].items())[:top]:
+        print(f"  {key:48s} {layer['vertices']:9d} {layer['flat_vertices']:10d}")
+    for name, key, value in report["violations"]:
+        print(f"  over budget: {name} {key} {value:.0f} > {report['budgets'][key]:.0f}")
+
+
+def parse_budget(value: str) -> tuple[str, float]:
+    """Parses KEY=VALUE into a budget."""
+    key, _, limit = value.partition("=")
+    if key not in BUDGETS or not limit:
+        raise argparse.ArgumentTypeError(
+            f"expected KEY=VALUE with KEY in {sorted(BUDGETS)}, got {value!r}"
+        )
+    return key, float(limit)
+
+
+def write_budget(
+    paths: Iterable[Path] = (PATH.mask,),
+    budgets: dict[str, float] = BUDGETS,
+    top: int = TOP,
+    filepath: Path | None = None,
+) -> list[dict[str, Any]]:
+    """Prints the budget report of mask files and directories of mask files.
+
+    Args:
+        paths: mask GDS or OASIS files, or build directories.
+        budgets: maximum counts per cell, see BUDGETS.
+        top: number of cells and layers printed per mask.
+        filepath: optional JSON output with the full report.
+    """
+    from ubc2.reticle import get_mask_filepaths
+
+    filepaths = []
+    for path in map(Path, paths):
+        filepaths += get_mask_filepaths(path) if path.is_dir() else [path]
+    reports = [get_report(p, budgets) for p in filepaths]
+    for report in reports:
+        print_report(report, top=top)
+    if filepath:
+        Path(filepath).write_text(json.dumps(reports, indent=2))
+    return reports
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "paths", type=Path, nargs="*", metavar="PATH", help="mask files or directories"
+    )
+    parser.add_argument(
+        "--budget",
+        type=parse_budget,
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help=f"maximum per cell of {', '.join(BUDGETS)}",
+    )
+    parser.add_argument("--top", type=int, default=TOP, help="cells shown per mask")
+    parser.add_argument("--json", type=Path, default=None, help="full report")
+    parser.add_argument(
+        "--dirpath",
+        type=Path,
+        default=None,
+        help="mask directory, defaults to build/mask",
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    """Prints the reports, returns 1 if any cell is over budget."""
+    reports = write_budget(
+        args.paths or [args.dirpath or PATH.mask],
+        {**BUDGETS, **dict(args.budget)},
+        top=args.top,
+        filepath=args.json,
+    )
+    return int(any(report["violations"] for report in reports))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+def test_count_cells() -> None:
+    import gdstk
+
+    square = gdstk.Cell("square")
+    square.add(gdstk.rectangle((0, 0), (1, 1), layer=1))
+    triangle = gdstk.Cell("triangle")
+    triangle.add(gdstk.Polygon([(0, 0), (1, 0), (0, 1)], layer=2))
+    triangle.add(gdstk.Reference(square, columns=10, rows=2, spacing=(2, 2)))
+    top = gdstk.Cell("top")
+    top.add(gdstk.Reference(triangle), gdstk.Reference(triangle, origin=(0, 10)))
+    top.add(gdstk.Reference(square))
+
+    cells = count_cells([top])
+    assert cells["square"].instances == 2 * 20 + 1
+    assert cells["triangle"].instances == 2
+    assert cells["triangle"].flat.vertices == 3 + 20 * 4
+    assert cells["top"].flat.vertices == 2 * (3 + 80) + 4
+    assert sum(b.contribution for b in cells.values()) == cells["top"].flat.vertices
+    assert cells["top"].flat_layers["1/0"].polygons == 41
+    assert get_violations(cells, {"contribution": 100}) == [
+        ("square", "contribution", 164)
+    ]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
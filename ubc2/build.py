@@ -0,0 +1,393 @@
+"""Build masks in parallel on a process pool."""
+
+from __future__ import annotations
+
+import ctypes
+import functools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from ubc2.config import MASK_FORMAT_ENV, PATH
+from ubc2.dry_run import record_footprints
+from ubc2.manifest import Manifest, get_mask_fingerprint, get_output_files, is_layout
+from ubc2.memory import get_peak_rss, get_rss
+from ubc2.profiler import PROFILER, write_chrome_trace, write_json
+
+MaskFunction = Callable[[], Path]
+
+# renameat2 flag swapping two paths, Linux 3.15+
+RENAME_EXCHANGE = 2
+
+
+@dataclass
+class MaskResult:
+    """Outcome of building one mask.
+
+    Args:
+        mask: label of the mask function.
+        gdspath: written GDS, None if the build failed.
+        error: formatted traceback, None if the build succeeded.
+        duration: wall time in seconds.
+        skipped: True if the mask was up to date and not rebuilt.
+        profile: stages and cell statistics recorded by the profiler.
+        memory_peak: peak RSS in bytes of the worker after building the mask.
+        memory_retained: RSS in bytes the worker kept after building the mask.
+    """
+
+    mask: str
+    gdspath: Path | None = None
+    error: str | None = None
+    duration: float = 0.0
+    skipped: bool = False
+    profile: dict[str, Any] | None = None
+    memory_peak: int | None = None
+    memory_retained: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def get_mask_label(mask: MaskFunction) -> str:
+    """Returns a stable, readable identifier for a mask function or partial."""
+    if isinstance(mask, functools.partial):
+        func = mask.func
+        keywords = ", ".join(f"{k}={v!r}" for k, v in sorted(mask.keywords.items()))
+        return f"{func.__module__}.{func.__qualname__}({keywords})"
+    return f"{mask.__module__}.{mask.__qualname__}"
+
+
+def init_worker(
+    profile: bool = False, trace_memory: bool = False, mask_format: str | None = None
+) -> None:
+    """Runs once per worker, before any mask module is imported."""
+    if mask_format:
+        os.environ[MASK_FORMAT_ENV] = mask_format
+    if profile:
+        PROFILER.enable(trace_memory=trace_memory)
+
+
+def build_mask(
+    mask: MaskFunction, dirpath: Path, release_cells: bool = False
+) -> MaskResult:
+    """Builds one mask writing its outputs into dirpath.
+
+    Runs in a worker process, so redirecting PATH.build only affects this worker.
+    Exceptions are caught and returned so one broken mask does not stop the run.
+    With UBC2_RECORD_FOOTPRINTS set, the size of every device routed with a fiber
+    array is recorded for dry runs.
+
+    Args:
+        mask: function that builds and writes the mask, returning its gdspath.
+        dirpath: where to write the outputs.
+        release_cells: once written, drop the mask cells from the gdsfactory cell
+            cache, keeping only the pinned PDK cells.
+    """
+    PATH.build = Path(dirpath)
+    PROFILER.reset()
+    label = get_mask_label(mask)
+    rss_start = get_rss()
+    t0 = time.perf_counter()
+    try:
+        with PROFILER.stage(label, category="mask"), record_footprints():
+            gdspath = Path(mask())
+        error = None
+    except Exception:
+        gdspath = None
+        error = traceback.format_exc()
+    duration = time.perf_counter() - t0
+
+    if release_cells:
+        from ubc2.memory import release_cells as release
+
+        release()
+    return MaskResult(
+        mask=label,
+        gdspath=gdspath,
+        error=error,
+        duration=duration,
+        profile=PROFILER.to_dict() if PROFILER.enabled and not error else None,
+        memory_peak=get_peak_rss(),
+        memory_retained=get_rss() - rss_start,
+    )
+
+
+def link(src: Path, dst: Path) -> None:
+    """Makes dst point to the same file as src without copying data.
+
+    Uses a hardlink, then a relative symlink, and copies only as a last resort.
+    """
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        try:
+            dst.symlink_to(os.path.relpath(src, dst.parent))
+        except OSError:
+            shutil.copyfile(src, dst)
+
+
+def collect(results: Iterable[MaskResult], dirpath: Path) -> list[Path]:
+    """Moves each mask outputs into dirpath and links its GDS into dirpath/gds.
+
+    Overflow dies written by the same mask are moved and linked with it. Updates
+    each result gdspath and returns the collected GDS paths.
+    """
+    dirpath_gds = dirpath / "gds"
+    dirpath_gds.mkdir(exist_ok=True, parents=True)
+    gdspaths = []
+
+    for result in results:
+        if not result.ok or result.skipped:
+            continue
+        for filepath in get_output_files(result.gdspath.parent, result.gdspath):
+            os.replace(filepath, dirpath / filepath.name)
+            if is_layout(filepath):
+                link(dirpath / filepath.name, dirpath_gds / filepath.name)
+                gdspaths.append(dirpath / filepath.name)
+        result.gdspath = dirpath / result.gdspath.name
+    return gdspaths
+
+
+def make_staging(dirpath: Path, incremental: bool = False) -> Path:
+    """Returns a new build directory next to dirpath, to be published as dirpath.
+
+    For incremental builds the staging directory starts as a hardlinked view of
+    dirpath, so unchanged masks are kept without copying any data. Files are only
+    ever replaced in staging, never modified in place, so the published directory
+    is not affected by the build.
+    """
+    dirpath.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{dirpath.name}.", dir=dirpath.parent))
+    staging.chmod(0o755)
+    if incremental and dirpath.is_dir():
+        shutil.copytree(
+            dirpath, staging, symlinks=True, copy_function=os.link, dirs_exist_ok=True
+        )
+    return staging
+
+
+def exchange(src: Path, dst: Path) -> bool:
+    """Swaps src and dst in one atomic rename, False where renameat2 is missing."""
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return False
+    at_fdcwd = -100
+    return not renameat2(
+        at_fdcwd, os.fsencode(src), at_fdcwd, os.fsencode(dst), RENAME_EXCHANGE
+    )
+
+
+def publish(staging: Path, dirpath: Path) -> None:
+    """Points dirpath to staging in one atomic rename.
+
+    dirpath is a symlink to the build directory published last. A new symlink to
+    staging replaces it with os.replace, so dirpath always exists and readers
+    either see the complete previous build or the complete new one. The previous
+    build directory is deleted after the swap.
+    """
+    link = staging.with_name(f"{staging.name}.link")
+    link.symlink_to(staging.name)
+    previous = None
+    if dirpath.is_symlink():
+        target = dirpath.parent / os.readlink(dirpath)
+        # only delete build directories published here, not a linked user directory
+        if target.parent == dirpath.parent and target.name.startswith(
+            f".{dirpath.name}."
+        ):
+            previous = target
+        os.replace(link, dirpath)
+    elif dirpath.exists():
+        # a directory published before builds were symlinked, swapped once. Without
+        # renameat2, dirpath is missing between the two renames.
+        previous = link
+        if not exchange(link, dirpath):
+            previous = staging.with_name(f"{staging.name}.old")
+            os.rename(dirpath, previous)
+            os.replace(link, dirpath)
+    else:
+        os.replace(link, dirpath)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def run_pool(
+    masks: list[MaskFunction],
+    results: list[MaskResult | None],
+    workdir: Path,
+    max_workers: int,
+    mp_context: str,
+    profile: bool,
+    trace_memory: bool,
+    release_cells: bool,
+    mask_format: str | None = None,
+) -> None:
+    """Builds the masks that have no result yet, filling in results."""
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(mp_context),
+        initializer=init_worker,
+        initargs=(profile, trace_memory, mask_format),
+    ) as pool:
+        futures = {
+            pool.submit(build_mask, mask, workdir / str(index), release_cells): index
+            for index, mask in enumerate(masks)
+            if results[index] is None
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                # the worker died (segfault, OOM ...) before returning a result
+                result = MaskResult(
+                    mask=get_mask_label(masks[index]),
+                    error=traceback.format_exc(),
+                )
+            results[index] = result
+            status = "ok" if result.ok else "FAILED"
+            memory = ""
+            if result.memory_peak is not None:
+                memory = (
+                    f" {result.memory_peak / 2**20:7.0f}MB"
+                    f" {result.memory_retained / 2**20:+7.0f}MB"
+                )
+            print(f"{status:6s} {result.duration:7.1f}s{memory} {result.mask}")
+
+
+def build_masks(
+    masks: Iterable[MaskFunction],
+    dirpath: Path = PATH.mask,
+    max_workers: int | None = None,
+    mp_context: str = "spawn",
+    incremental: bool = False,
+    profile: bool = False,
+    trace_memory: bool = False,
+    release_cells: bool = False,
+    mask_format: str | None = None,
+) -> list[MaskResult]:
+    """Builds masks on a process pool and publishes them into dirpath.
+
+    Each worker is a fresh process with its own gdsfactory cell cache and writes
+    into a private directory. Outputs are gathered in a staging directory next to
+    dirpath once all workers finish, and the staging directory then replaces
+    dirpath. An interrupted build leaves the previous dirpath untouched.
+
+    Args:
+        masks: functions that build and write one mask each, returning its gdspath.
+        dirpath: where to publish the GDS, YAML and CSV files.
+        max_workers: number of processes. Defaults to the number of CPUs.
+        mp_context: multiprocessing start method.
+        incremental: skip masks whose fingerprint matches the build manifest
+            in dirpath and keep their existing outputs. Otherwise dirpath only
+            contains the masks of this build.
+        profile: record per-stage timings and cell cache statistics into
+            dirpath/profile.json and dirpath/profile.trace.json (Chrome trace).
+        trace_memory: also record allocation peaks per stage (slower).
+        release_cells: release the cells of each mask once it is written, keeping
+            only the shared PDK cells, so worker memory does not grow with every
+            mask it builds.
+        mask_format: gds or oas (OASIS), set as UBC2_MASK_FORMAT in the workers
+            only. Defaults to UBC2_MASK_FORMAT, or gds.
+
+    Returns:
+        one MaskResult per mask, in the same order as masks.
+    """
+    masks = list(masks)
+    dirpath = Path(dirpath)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(masks) or 1)
+    labels = [get_mask_label(mask) for mask in masks]
+    fingerprints = [get_mask_fingerprint(mask, mask_format) for mask in masks]
+    results: list[MaskResult | None] = [None] * len(masks)
+
+    staging = make_staging(dirpath, incremental=incremental)
+    try:
+        manifest = Manifest(staging)
+        if incremental:
+            for index, (label, fingerprint) in enumerate(zip(labels, fingerprints)):
+                if manifest.is_up_to_date(label, fingerprint):
+                    results[index] = MaskResult(
+                        mask=label, gdspath=manifest.get_gdspath(label), skipped=True
+                    )
+                    print(f"{'skip':6s} {0:7.1f}s {label}")
+                else:
+                    # a rebuild may not write the same files, e.g. GDS after OASIS
+                    manifest.remove_outputs(label)
+
+        with tempfile.TemporaryDirectory(prefix=".build_", dir=staging) as workdir:
+            run_pool(
+                masks,
+                results,
+                workdir=Path(workdir),
+                max_workers=max_workers,
+                mp_context=mp_context,
+                profile=profile,
+                trace_memory=trace_memory,
+                release_cells=release_cells,
+                mask_format=mask_format,
+            )
+            collect(results, staging)
+
+        for result, fingerprint in zip(results, fingerprints):
+            if result.skipped:
+                continue
+            if result.ok:
+                manifest.update(
+                    result.mask, fingerprint, result.gdspath, result.duration
+                )
+            else:
+                manifest.remove(result.mask)
+                print(f"\n{result.mask} failed:\n{result.error}")
+        manifest.write()
+
+        if profile:
+            profiles = [result.profile for result in results if result.profile]
+            write_json(profiles, staging / "profile.json")
+            write_chrome_trace(profiles, staging / "profile.trace.json")
+
+        publish(staging, dirpath)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    for result in results:
+        if result.gdspath:
+            result.gdspath = dirpath / result.gdspath.name
+
+    peaks = [result.memory_peak for result in results if result.memory_peak]
+    if peaks:
+        print(f"peak worker memory {max(peaks) / 2**20:.0f}MB")
+    return results
+
+
+def test_publish(tmp_path: Path) -> None:
+    from ubc2.profiler import replace_text
+
+    dirpath = tmp_path / "mask"
+    dirpath.mkdir()
+    (dirpath / "profile.json").write_text("0")
+    for version in "12":
+        staging = make_staging(dirpath, incremental=True)
+        replace_text(staging / "profile.json", version)
+        # the published build is hardlinked, not modified
+        assert (dirpath / "profile.json").read_text() != version
+        publish(staging, dirpath)
+        assert dirpath.is_symlink()
+        assert (dirpath / "profile.json").read_text() == version
+    assert {p.name for p in tmp_path.iterdir()} == {"mask", staging.name}
+
+
+if __name__ == "__main__":
+    import ubc2.ubc_simon_dcs as dcs
+
+    build_masks([dcs.test_mask_dcs_1, dcs.test_mask_dcs_2])
@@ -0,0 +1,409 @@
+"""Persistent on-disk cache for @gf.cell components.
+
+The gdsfactory cell cache only lives in memory, so every new process rebuilds the
+same cells. `disk_cache` stores the geometry (GDS), ports, info and settings of a
+cell keyed by its function, arguments, source code and library versions, so a later
+process can load it without running the Python construction.
+
+The cache is opt-in: set the environment variable UBC2_CELL_CACHE=1 to enable it.
+
+.. code::
+
+    @disk_cache
+    @gf.cell
+    def ring(radius: float = 10) -> gf.Component:
+        ...
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from ubc2.config import PATH
+from ubc2.manifest import (
+    clean_value,
+    get_local_modules,
+    get_package_versions,
+    get_source_hash,
+)
+
+if TYPE_CHECKING:
+    import gdstk
+
+ENV_ENABLE = "UBC2_CELL_CACHE"
+ENV_MAX_SIZE = "UBC2_CELL_CACHE_MAX_SIZE"
+# kwargs consumed by @gf.cell itself, calls using them bypass the disk cache
+CELL_KWARGS = {"name", "cache", "prefix", "decorator", "info"}
+# components loaded in this process, one dict per decorated function or reader
+LOADED: list[dict[str, Any]] = []
+
+
+def is_enabled() -> bool:
+    return os.environ.get(ENV_ENABLE, "").lower() in {"1", "true", "yes", "on"}
+
+
+def _contains_component(value: Any) -> bool:
+    import gdsfactory as gf
+
+    if isinstance(value, gf.Component):
+        return True
+    if isinstance(value, dict):
+        return any(_contains_component(v) for v in value.values())
+    if isinstance(value, list | tuple):
+        return any(_contains_component(v) for v in value)
+    if isinstance(value, functools.partial):
+        return _contains_component(value.args) or _contains_component(value.keywords)
+    return False
+
+
+def dump_metadata(component) -> dict[str, Any]:
+    """Returns the name, ports, info and settings of component as JSON values."""
+    from gdsfactory.serialization import clean_value_json
+
+    return dict(
+        name=component.name,
+        ports=[port.to_dict() for port in component.ports.values()],
+        info=clean_value_json(dict(component.info)),
+        settings=(
+            clean_value_json(component.settings.model_dump())
+            if hasattr(component.settings, "model_dump")
+            else None
+        ),
+    )
+
+
+def load_metadata(component, metadata: dict[str, Any]) -> None:
+    """Restores the metadata from dump_metadata into an imported component."""
+    from gdsfactory.cell import Settings
+
+    component.name = metadata["name"]
+    for port in metadata["ports"]:
+        component.add_port(
+            name=port["name"],
+            center=port["center"],
+            width=port["width"],
+            orientation=port["orientation"],
+            layer=tuple(port["layer"]),
+            port_type=port["port_type"],
+            shear_angle=port["shear_angle"],
+        )
+    component.info.update(metadata["info"])
+    if metadata["settings"]:
+        component.settings = Settings(**metadata["settings"])
+
+
+def get_cell(component) -> gdstk.Cell:
+    """Returns the gdstk cell of component.
+
+    gdsfactory 7 has no public accessor for it, so this is the one place that
+    reads Component internals, checked by test_get_cell.
+    """
+    return component._cell
+
+
+def to_component(cell: gdstk.Cell, children: list):
+    """Returns a Component with the geometry and name of cell.
+
+    gf.import_gds cannot share cells between files, and gf.Component cleans and
+    numbers names, so the component is built with add and add_ref and only its
+    cell is renamed.
+
+    Args:
+        cell: read from a GDS file, keeps its name.
+        children: Component of each of cell.references, in order.
+    """
+    import gdsfactory as gf
+    import numpy as np
+
+    component = gf.Component()
+    get_cell(component).name = cell.name
+    component.add(cell.polygons + cell.paths + cell.labels)
+    for e, child in zip(cell.references, children):
+        component.add_ref(
+            child,
+            origin=e.origin,
+            rotation=np.rad2deg(e.rotation),
+            magnification=e.magnification,
+            x_reflection=e.x_reflection,
+            columns=e.repetition.columns or 1,
+            rows=e.repetition.rows or 1,
+            spacing=e.repetition.spacing,
+            v1=e.repetition.v1,
+            v2=e.repetition.v2,
+        )
+    component.imported_gds = True
+    return component
+
+
+class SharedCells:
+    """Components read from GDS files, deduplicated by geometry hash.
+
+    Cells of the gdsfactory cell cache with the same name and geometry are reused
+    too, so sweep chunks and cached cells share cells with the devices built in
+    this process.
+    """
+
+    def __init__(self) -> None:
+        # geometry hash: component
+        self.components: dict[str, Any] = {}
+        # geometry hash of the cells of cached components, by id
+        self.hashes: dict[int, str] = {}
+        # keeps hashed cells alive, so their ids are not reused
+        self.cells: dict[int, gdstk.Cell] = {}
+        LOADED.extend([self.components, self.hashes, self.cells])
+
+    def get_cached(self, name: str, scaling: float) -> tuple[Any, str] | None:
+        """Returns the cached component called name and its geometry hash."""
+        from ubc2.reticle import get_cell_hash, iter_cells
+
+        component = sys.modules["gdsfactory.cell"].CACHE.get(name)
+        if component is None:
+            return None
+        top = get_cell(component)
+        for cell in iter_cells([top]):
+            if id(cell) not in self.hashes:
+                self.hashes[id(cell)] = get_cell_hash(cell, self.hashes, scaling)
+                self.cells[id(cell)] = cell
+        return component, self.hashes[id(top)]
+
+    def read(self, gdspath: Path, metadata: list[dict[str, Any]]) -> list:
+        """Returns the top cells named in metadata, reusing the cells already read."""
+        import gdstk
+
+        from ubc2.reticle import get_cell_hash, iter_cells
+
+        library = gdstk.read_gds(gdspath)
+        scaling = library.unit / library.precision
+        cells = {cell.name: cell for cell in library.cells}
+        names = {component.name for component in self.components.values()}
+        hashes: dict[int, str] = {}
+        new: set[str] = set()
+
+        for cell in iter_cells(library.top_level()):
+            digest = hashes[id(cell)] = get_cell_hash(cell, hashes, scaling)
+            if digest in self.components:
+                continue
+            cached = self.get_cached(cell.name, scaling)
+            if cached and cached[1] == digest:
+                self.components[digest] = cached[0]
+                continue
+            if cached or cell.name in names:
+                cell.name = f"{cell.name}_{digest[:8]}"
+            children = [self.components[hashes[id(e.cell)]] for e in cell.references]
+            self.components[digest] = to_component(cell, children)
+            names.add(cell.name)
+            new.add(digest)
+
+        components = []
+        for data in metadata:
+            digest = hashes[id(cells[data["name"]])]
+            component = self.components[digest]
+            if digest in new:
+                load_metadata(component, data)
+                component.lock()
+                new.discard(digest)
+            components.append(component)
+        return components
+
+
+SHARED_CELLS = SharedCells()
+
+
+class CellCache:
+    """Directory of cached cells, evicted least recently used first.
+
+    Each entry is a pair of files: `<key>.gds` with the geometry and `<key>.json`
+    with the name, ports, info and settings.
+
+    Args:
+        dirpath: cache directory.
+        max_size: maximum size in bytes before evicting least recently used cells.
+    """
+
+    def __init__(self, dirpath: Path = PATH.cell_cache, max_size: int = 2**30) -> None:
+        self.dirpath = Path(dirpath)
+        self.max_size = max_size
+
+    def get_key(
+        self, func: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> str:
+        """Returns hash of cell function, arguments, sources and library versions."""
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        module = sys.modules[func.__module__]
+        data = {
+            "function": f"{func.__module__}.{func.__qualname__}",
+            "arguments": clean_value(dict(bound.arguments)),
+            "sources": {
+                m.__name__: get_source_hash(m) for m in get_local_modules(module)
+            },
+            "versions": get_package_versions(),
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.dirpath / f"{key}.gds", self.dirpath / f"{key}.json"
+
+    def get(self, key: str):
+        """Returns cached Component or None.
+
+        Subcells already loaded in this process, such as the S-bends shared by
+        couplers, are reused instead of imported again.
+        """
+        gdspath, jsonpath = self._paths(key)
+        if not (gdspath.exists() and jsonpath.exists()):
+            return None
+
+        (component,) = SHARED_CELLS.read(gdspath, [json.loads(jsonpath.read_text())])
+
+        for path in (gdspath, jsonpath):
+            path.touch()
+        return component
+
+    def put(self, key: str, component) -> None:
+        """Stores component and evicts old entries if the cache is too big."""
+        self.dirpath.mkdir(parents=True, exist_ok=True)
+        gdspath, jsonpath = self._paths(key)
+        component.write_gds(gdspath=gdspath, logging=False)
+        jsonpath.write_text(json.dumps(dump_metadata(component)))
+        self.evict()
+
+    def size(self) -> int:
+        """Returns total size of the cache in bytes."""
+        if not self.dirpath.exists():
+            return 0
+        return sum(path.stat().st_size for path in self.dirpath.iterdir())
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits in max_size."""
+        if not self.dirpath.exists():
+            return
+        entries: dict[str, list[Path]] = {}
+        for path in self.dirpath.iterdir():
+            entries.setdefault(path.stem, []).append(path)
+
+        def last_used(paths: list[Path]) -> float:
+            return max(path.stat().st_mtime for path in paths)
+
+        total = self.size()
+        for paths in sorted(entries.values(), key=last_used):
+            if total <= self.max_size:
+                break
+            for path in paths:
+                total -= path.stat().st_size
+                path.unlink()
+
+    def clear(self) -> None:
+        """Invalidates all cached cells."""
+        shutil.rmtree(self.dirpath, ignore_errors=True)
+
+
+CELL_CACHE = CellCache(max_size=int(os.environ.get(ENV_MAX_SIZE, 2**30)))
+
+
+def clear_loaded() -> None:
+    """Forgets components loaded in this process, so they can be released."""
+    for loaded in LOADED:
+        loaded.clear()
+
+
+def disk_cache(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator that stores the components returned by a @gf.cell on disk.
+
+    Calls with Component arguments or @gf.cell keywords (name, decorator ...) are
+    not cached on disk because their geometry is not captured by the key.
+    """
+    loaded: dict[str, Any] = {}
+    LOADED.append(loaded)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if (
+            not is_enabled()
+            or CELL_KWARGS.intersection(kwargs)
+            or _contains_component((args, kwargs))
+        ):
+            return func(*args, **kwargs)
+
+        key = CELL_CACHE.get_key(inspect.unwrap(func), args, kwargs)
+        if key in loaded:
+            return loaded[key]
+
+        component = CELL_CACHE.get(key)
+        if component is None:
+            component = func(*args, **kwargs)
+            CELL_CACHE.put(key, component)
+        loaded[key] = component
+        return component
+
+    return wrapper
+
+
+def test_get_cell() -> None:
+    import gdsfactory as gf
+
+    square = gf.components.rectangle(size=(1, 1), layer=(1, 0))
+    c = gf.Component("get_cell_top")
+    ref = c.add_ref(square, origin=(2, 0))
+    cell = get_cell(c)
+
+    assert cell.name == c.name
+    assert cell.references[0].cell is get_cell(ref.parent)
+    assert get_cell(square).polygons == square.polygons
+    # renaming the cell renames the component, which to_component relies on
+    cell.name = "get_cell_renamed"
+    assert c.name == "get_cell_renamed"
+
+
+def test_to_component_matches_import_gds(tmp_path: Path) -> None:
+    import gdsfactory as gf
+    import gdstk
+    import numpy as np
+
+    c = gf.Component("to_component_top")
+    square = gf.components.rectangle(size=(1, 1), layer=(1, 0))
+    c.add_ref(square, origin=(5, 0), rotation=30, x_reflection=True)
+    c.add_ref(square, columns=3, rows=2, spacing=(2, 3))
+    # gdstk writes arrays with skewed vectors to GDS as single references
+    c.add_ref(square, columns=4, v1=(2, 0), v2=(0, 2))
+    c.add_label("label", position=(1, 2), layer=(10, 0))
+    gdspath = c.write_gds(tmp_path / "c.gds")
+
+    imported = gf.import_gds(gdspath)
+    (cell,) = gdstk.read_gds(gdspath).top_level()
+    (child,) = {ref.parent for ref in imported.references}
+    component = to_component(cell, [child] * len(cell.references))
+
+    assert component.name == cell.name
+    assert component.hash_geometry() == imported.hash_geometry()
+    assert [r.parent for r in component.references] == [child] * 3
+    for r, i in zip(component.references, imported.references):
+        np.testing.assert_allclose(r.origin, i.origin)
+        assert (r.rotation, r.x_reflection, r.columns, r.rows, r.v1) == (
+            i.rotation,
+            i.x_reflection,
+            i.columns,
+            i.rows,
+            i.v1,
+        )
+    assert [label.text for label in component.labels] == ["label"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the ubc2 cell cache.")
+    parser.add_argument("--clear", action="store_true", help="remove all cells")
+    args = parser.parse_args()
+    if args.clear:
+        CELL_CACHE.clear()
+    print(f"{CELL_CACHE.dirpath}: {CELL_CACHE.size() / 1e6:.1f} MB")
@@ -0,0 +1,238 @@
+"""Command line interface.
+
+.. code::
+
+    ubc2 list
+    ubc2 build EBeam_simbilod_42 EBeam_JoaquinMatres_11
+    ubc2 build --incremental
+    ubc2 build --dry-run
+    ubc2 build --shard 1/3
+    ubc2 merge --shards 3
+    ubc2 reticle
+    ubc2 budget
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from collections.abc import Sequence
+from pathlib import Path
+
+from ubc2.budget import add_arguments as add_budget_arguments
+from ubc2.budget import run as budget
+from ubc2.config import MASK_FORMAT_ENV, MASK_FORMATS, PATH
+from ubc2.masks import MASKS
+
+
+def list_masks(args: argparse.Namespace) -> int:
+    for name, entry_point in MASKS.items():
+        print(f"{name:40s} {entry_point}")
+    return 0
+
+
+def get_names(args: argparse.Namespace) -> list[str] | None:
+    """Returns the requested mask names, None if any is not registered."""
+    names = args.names or list(MASKS)
+    unknown = [name for name in names if name not in MASKS]
+    if unknown:
+        print(f"Unknown masks {unknown}, run `ubc2 list` to see registered masks")
+        return None
+    return names
+
+
+def build(args: argparse.Namespace) -> int:
+    from ubc2.build import build_masks
+    from ubc2.dry_run import ENV_RECORD
+    from ubc2.masks import get_mask
+    from ubc2.shard import get_shard, get_shard_dirpath, parse_shard
+
+    names = get_names(args)
+    if names is None:
+        return 2
+    if args.record_footprints:
+        os.environ[ENV_RECORD] = "1"
+    masks = [get_mask(name) for name in names]
+    if args.dry_run:
+        return dry_run(masks)
+    dirpath = args.dirpath or PATH.mask
+    if args.shard:
+        index, count = parse_shard(args.shard)
+        masks = get_shard(masks, index, count, dirpath)
+        dirpath = get_shard_dirpath(dirpath, index, count)
+    results = build_masks(
+        masks,
+        dirpath=dirpath,
+        max_workers=args.workers,
+        incremental=args.incremental,
+        profile=args.profile or args.trace_memory,
+        trace_memory=args.trace_memory,
+        release_cells=args.release_cells,
+        mask_format=args.format,
+    )
+    return int(not all(result.ok for result in results))
+
+
+def dry_run(masks: list) -> int:
+    import ubcpdk
+
+    from ubc2.dry_run import dry_run, print_result
+
+    ubcpdk.PDK.activate()
+    ok = True
+    for mask in masks:
+        result = dry_run(mask)
+        print_result(result)
+        ok &= result.ok
+    return int(not ok)
+
+
+def merge(args: argparse.Namespace) -> int:
+    from ubc2.masks import get_mask
+    from ubc2.shard import merge_shards
+
+    names = get_names(args)
+    if names is None:
+        return 2
+    if args.format:
+        os.environ[MASK_FORMAT_ENV] = args.format
+    masks = [get_mask(name) for name in names]
+    errors = merge_shards(masks, dirpath=args.dirpath or PATH.mask, count=args.shards)
+    return int(bool(errors))
+
+
+def reticle(args: argparse.Namespace) -> int:
+    from ubc2.reticle import write_reticle
+
+    filepath = write_reticle(
+        args.dirpath or PATH.mask,
+        filepath=args.output,
+        columns=args.columns,
+        spacing=args.spacing,
+    )
+    return int(filepath is None)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ubc2", description="Build ubc2 masks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_list = subparsers.add_parser("list", help="list registered masks")
+    parser_list.set_defaults(func=list_masks)
+
+    parser_build = subparsers.add_parser("build", help="build masks by name")
+    parser_build.add_argument(
+        "names", nargs="*", metavar="NAME", help="masks to build, defaults to all"
+    )
+    parser_build.add_argument(
+        "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser_build.add_argument(
+        "--incremental", action="store_true", help="only rebuild changed masks"
+    )
+    parser_build.add_argument(
+        "--profile",
+        action="store_true",
+        help="write per-stage timings to profile.json and profile.trace.json",
+    )
+    parser_build.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="profile and record allocation peaks per stage (slower)",
+    )
+    parser_build.add_argument(
+        "--release-cells",
+        action="store_true",
+        help="release each mask cells once written, keeping shared PDK cells",
+    )
+    parser_build.add_argument(
+        "--format",
+        choices=MASK_FORMATS,
+        default=None,
+        help="layout file format, gds or oas (compressed OASIS), defaults to gds",
+    )
+    parser_build.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only check that the devices fit, using predicted fiber array sizes",
+    )
+    parser_build.add_argument(
+        "--record-footprints",
+        action="store_true",
+        help="record the size of every routed device for later dry runs",
+    )
+    parser_build.add_argument(
+        "--shard",
+        default=None,
+        metavar="I/N",
+        help="only build shard I of N, into DIRPATH.shard-I-of-N",
+    )
+    parser_build.add_argument(
+        "--dirpath",
+        type=Path,
+        default=None,
+        help="output directory, defaults to build/mask",
+    )
+    parser_build.set_defaults(func=build)
+
+    parser_merge = subparsers.add_parser(
+        "merge", help="verify sharded build outputs and merge them"
+    )
+    parser_merge.add_argument(
+        "names", nargs="*", metavar="NAME", help="masks expected, defaults to all"
+    )
+    parser_merge.add_argument(
+        "--shards", type=int, required=True, help="number of shards"
+    )
+    parser_merge.add_argument(
+        "--format",
+        choices=MASK_FORMATS,
+        default=None,
+        help="layout file format the shards were built with",
+    )
+    parser_merge.add_argument(
+        "--dirpath",
+        type=Path,
+        default=None,
+        help="output directory, defaults to build/mask",
+    )
+    parser_merge.set_defaults(func=merge)
+
+    parser_reticle = subparsers.add_parser(
+        "reticle", help="assemble built masks into one reticle GDS"
+    )
+    parser_reticle.add_argument(
+        "--dirpath",
+        type=Path,
+        default=None,
+        help="mask directory, defaults to build/mask",
+    )
+    parser_reticle.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="reticle GDS, defaults to reticle.gds next to the mask directory",
+    )
+    parser_reticle.add_argument(
+        "--columns", type=int, default=None, help="masks per row"
+    )
+    parser_reticle.add_argument(
+        "--spacing", type=float, default=100.0, help="between masks in um"
+    )
+    parser_reticle.set_defaults(func=reticle)
+
+    parser_budget = subparsers.add_parser(
+        "budget", help="report polygons and vertices per cell of built masks"
+    )
+    add_budget_arguments(parser_budget)
+    parser_budget.set_defaults(func=budget)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,18 @@
 """Store configuration."""
 
-__all__ = ["PATH"]
+__all__ = [
+    "PATH",
+    "MASK_FORMATS",
+    "MASK_FORMAT_ENV",
+    "DIE_SUFFIXES",
+    "MAX_POINTS",
+    "get_mask_format",
+    "get_die_name",
+]
 
+import os
 import pathlib
+import string
 
 home = pathlib.Path.home()
 cwd = pathlib.Path.cwd()
@@ -10,7 +20,6 @@ cwd_config = cwd / "config.yml"
 
 home_config = home / ".config" / "ubc2.yml"
 config_dir = home / ".config"
-config_dir.mkdir(exist_ok=True)
 module_path = pathlib.Path(__file__).parent.absolute()
 repo_path = module_path.parent
 
@@ -19,9 +28,40 @@ class Path:
     module = module_path
     repo = repo_path
     build = repo / "build"
+    mask = build / "mask"
+    cell_cache = home / ".cache" / "ubc2" / "cells"
 
 
 PATH = Path()
 
+# layout file format of the masks, GDSII or OASIS with compressed cells
+MASK_FORMATS = ("gds", "oas")
+MASK_FORMAT_ENV = "UBC2_MASK_FORMAT"
+
+
+def get_mask_format() -> str:
+    """Returns the mask layout format from UBC2_MASK_FORMAT, GDS by default."""
+    mask_format = os.environ.get(MASK_FORMAT_ENV, "gds").lower()
+    if mask_format not in MASK_FORMATS:
+        raise ValueError(f"{MASK_FORMAT_ENV}={mask_format!r} not in {MASK_FORMATS}")
+    return mask_format
+
+
+# vertices per polygon, same fracturing as the gdsfactory GDS writer
+MAX_POINTS = 4000
+
+# devices that do not fit a die spill into dies named {mask}b, {mask}c ...
+DIE_SUFFIXES = string.ascii_lowercase[1:]
+
+
+def get_die_name(name: str, index: int) -> str:
+    """Returns the name of die index of mask name, the mask name for the first."""
+    if index == 0:
+        return name
+    if index > len(DIE_SUFFIXES):
+        raise ValueError(f"{name} needs {index + 1} dies, more than supported")
+    return f"{name}{DIE_SUFFIXES[index - 1]}"
+
+
 if __name__ == "__main__":
     print(PATH)
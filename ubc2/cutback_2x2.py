@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import gdsfactory as gf
+import numpy as np
 from gdsfactory.component import Component
+from gdsfactory.component_reference import ComponentReference
 from gdsfactory.components.component_sequence import component_sequence
 from gdsfactory.components.mmi2x2 import mmi2x2
 from gdsfactory.typings import ComponentSpec
 
+from ubc2.cell_cache import disk_cache
 
+
+@disk_cache
 @gf.cell
 def cutback_2x2(
     component: ComponentSpec = mmi2x2,
@@ -18,6 +23,9 @@ def cutback_2x2(
 ) -> Component:
     """Returns a daisy chain of 2x2 couplers for measuring their loss.
 
+    The AB unit of the chain is placed once as an array of cols columns, so the
+    cell size does not grow with cols.
+
     Args:
         component: for cutback.
         cols: number of columns/components.
@@ -34,22 +42,60 @@ def cutback_2x2(
         "B": (component, port4, port2),
     }
 
-    # Generate the sequence of staircases
-
-    s = "AB" * cols
-
-    seq = component_sequence(sequence=s, symbol_to_component=symbol_to_component)
-
+    # one period of the staircase, repeated cols times
+    unit = component_sequence(sequence="AB", symbol_to_component=symbol_to_component)
     c = gf.Component()
-    ref = c << seq
-    c.add_ports(ref.ports)
 
-    n = len(s) - 2
+    if is_periodic(unit):
+        dx, dy = unit.ports["o2"].center - unit.ports["o1"].center
+        ref = ComponentReference(unit, columns=cols, v1=(dx, dy), v2=(-dy, dx))
+        c.add(ref)
+        c.add_port("o1", port=ref.ports["o1"])
+        c.add_port(
+            "o2", port=ref.ports["o2"].move_copy((cols - 1) * dx, (cols - 1) * dy)
+        )
+    else:
+        seq = component_sequence(
+            sequence="AB" * cols, symbol_to_component=symbol_to_component
+        )
+        ref = c << seq
+        c.add_ports(ref.ports)
+
+    n = 2 * cols - 2
     c.copy_child_info(component)
     c.info["components"] = n
     return c
 
 
+def is_periodic(unit: Component) -> bool:
+    """Returns True if the next unit connects to unit translated, not rotated."""
+    o1, o2 = unit.ports["o1"], unit.ports["o2"]
+    return np.isclose((o2.orientation - o1.orientation) % 360, 180)
+
+
+def test_cutback_2x2_array() -> None:
+    """The array has the ports and geometry of the chained references."""
+    import gdstk
+
+    c = cutback_2x2(cols=6)
+    mmi = mmi2x2()
+    symbol_to_component = {"A": (mmi, "o1", "o3"), "B": (mmi, "o4", "o2")}
+    chain = component_sequence(
+        sequence="AB" * 6, symbol_to_component=symbol_to_component
+    )
+    assert len(c.references) == 1
+    assert c.info["components"] == 10
+    for name in ("o1", "o2"):
+        np.testing.assert_allclose(c.ports[name].center, chain.ports[name].center)
+        assert c.ports[name].orientation == chain.ports[name].orientation
+
+    for layer in chain.layers:
+        xor = gdstk.boolean(
+            c.get_polygons(by_spec=layer), chain.get_polygons(by_spec=layer), "xor"
+        )
+        assert sum(p.area() for p in xor) < 1e-6
+
+
 if __name__ == "__main__":
     c = cutback_2x2(component=gf.c.coupler, cols=2)
     c.show(show_ports=True)
@@ -0,0 +1,445 @@
+"""Check that masks fit their die before building the fiber array routing.
+
+A dry run calls the mask function with three substitutions:
+
+- `add_fiber_array` and `add_fiber_array_pads_rf` return a rectangle with the
+  footprint the routed device would have, instead of routing it. The footprint
+  comes from the footprint cache, recorded by real builds run with
+  UBC2_RECORD_FOOTPRINTS=1, or from an analytic estimate based on the device size
+  and number of optical ports.
+- `gf.pack` and `ubc2.packing.pack` (and the `pack` partials of write_mask) pack
+  the bounding boxes with the same packer and rounding and return one empty
+  Component per bin.
+- `write_mask_gds_with_metadata` writes nothing and records the die name.
+
+Sweeps are built in this process, so large sweeps also use the footprints.
+
+So a mask that limits its dies raises the same "Failed to pack" error as the real
+build, and masks that keep only `c[0]` report that they drop devices.
+
+.. code::
+
+    ubc2 build --record-footprints EBeam_JoaquinMatres_11
+    ubc2 build --dry-run EBeam_JoaquinMatres_11 EBeam_JoaquinMatres_17
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+import traceback
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from ubc2.config import PATH
+from ubc2.manifest import clean_value, get_package_versions
+
+# set to 1 to record the footprints of real builds, for later dry runs
+ENV_RECORD = "UBC2_RECORD_FOOTPRINTS"
+# (module, attribute) of the fiber array wrappers whose footprint is predicted
+WRAPPERS = (
+    ("ubcpdk.components", "add_fiber_array"),
+    ("ubcpdk.components", "add_fiber_array_pads_rf"),
+)
+# grating coupler pitch and the fiber array height beyond the outer couplers
+GC_PITCH = 127.0
+GC_MARGIN = 21.4
+# routing added around the device, measured on the ubcpdk wrappers (upper bounds)
+ROUTING_MARGIN = 80.0
+MARGINS = {"add_fiber_array": 57.0, "add_fiber_array_pads_rf": 230.0}
+
+
+class FootprintCache:
+    """Directory of routed device sizes, one `<key>.json` file per device.
+
+    One file per entry, so worker processes record footprints without locking.
+
+    Args:
+        dirpath: cache directory.
+    """
+
+    def __init__(self, dirpath: Path = PATH.cell_cache.parent / "footprints") -> None:
+        self.dirpath = Path(dirpath)
+
+    def get_key(
+        self, func: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> str:
+        """Returns hash of the wrapper name, device, arguments and versions."""
+        component, arguments = get_arguments(func, args, kwargs)
+        data = {
+            "function": func.__name__,
+            "component": get_device(component),
+            "arguments": clean_value(_replace_components(arguments)),
+            "versions": get_package_versions(),
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> tuple[float, float] | None:
+        """Returns cached (width, height) or None."""
+        filepath = self.dirpath / f"{key}.json"
+        if not filepath.exists():
+            return None
+        width, height = json.loads(filepath.read_text())["size"]
+        return width, height
+
+    def put(self, key: str, size: tuple[float, float]) -> None:
+        self.dirpath.mkdir(parents=True, exist_ok=True)
+        filepath = self.dirpath / f"{key}.json"
+        data = json.dumps({"size": [float(v) for v in size]})
+        if not filepath.exists() or filepath.read_text() != data:
+            filepath.write_text(data)
+
+
+FOOTPRINTS = FootprintCache()
+
+
+def is_recording() -> bool:
+    return os.environ.get(ENV_RECORD, "").lower() in {"1", "true", "yes", "on"}
+
+
+def get_arguments(
+    func: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]
+) -> tuple[Any, dict[str, Any]]:
+    """Returns the device and the other arguments of a fiber array wrapper call."""
+    signature = inspect.signature(func)
+    arguments = dict(signature.bind(*args, **kwargs).arguments)
+    component = arguments.pop("component", signature.parameters["component"].default)
+    return component, arguments
+
+
+def get_device(component) -> dict[str, Any]:
+    """Returns the bounding box and ports of a device.
+
+    The routing around a device only depends on its outline and ports. Names are
+    left out as they depend on what the process built before (`$N` suffixes, hashes
+    of Component arguments).
+    """
+    import gdsfactory as gf
+
+    component = gf.get_component(component)
+    return {
+        "bbox": [[round(float(v), 3) for v in xy] for xy in component.bbox],
+        "ports": sorted(
+            [name, *[round(float(v), 3) for v in (*port.center, port.orientation)]]
+            for name, port in component.ports.items()
+        ),
+    }
+
+
+def _replace_components(value: Any) -> Any:
+    """Returns value with Components replaced by their device description."""
+    import gdsfactory as gf
+
+    if isinstance(value, gf.Component):
+        return get_device(value)
+    if isinstance(value, dict):
+        return {k: _replace_components(v) for k, v in value.items()}
+    if isinstance(value, list | tuple):
+        return [_replace_components(v) for v in value]
+    return value
+
+
+def estimate_footprint(function_name: str, component) -> tuple[float, float]:
+    """Returns an upper estimate of the (width, height) of a routed device.
+
+    The ubcpdk wrappers rotate the device by -90, so its height becomes the width
+    of the routed device, and the grating couplers line up along the height.
+    """
+    import gdsfactory as gf
+
+    component = gf.get_component(component)
+    width, height = component.size
+    ports = len(component.get_ports_list(port_type="optical"))
+    gc_span = max(ports - 1, 1) * GC_PITCH + GC_MARGIN
+    return (
+        float(height + MARGINS.get(function_name, ROUTING_MARGIN)),
+        float(max(gc_span, width + ROUTING_MARGIN)),
+    )
+
+
+@contextlib.contextmanager
+def patch(replacements: dict[int, Callable[[Any], Any]]) -> Iterator[None]:
+    """Rebinds every module attribute holding a replaced object.
+
+    Covers the wrapper modules and the aliases the ubc2 mask modules bound at import
+    time (`add_gc = ...`, `from ubc2.write_mask import pack`).
+
+    Partials of a replaced function are rebound to a partial of its replacement.
+
+    Args:
+        replacements: id of the original function: decorator returning its
+            replacement.
+    """
+    import gdsfactory  # noqa: F401
+    import ubcpdk.components  # noqa: F401
+
+    modules = ["gdsfactory", "ubcpdk.components"]
+    modules += [name for name in sys.modules if name.split(".")[0] == "ubc2"]
+    originals: list[tuple[Any, str, Any]] = []
+    try:
+        for module_name in modules:
+            module = sys.modules[module_name]
+            for attribute, value in list(vars(module).items()):
+                if isinstance(value, functools.partial):
+                    if id(value.func) not in replacements:
+                        continue
+                    replacement = functools.partial(
+                        replacements[id(value.func)](value.func),
+                        *value.args,
+                        **value.keywords,
+                    )
+                elif id(value) in replacements:
+                    replacement = replacements[id(value)](value)
+                else:
+                    continue
+                originals.append((module, attribute, value))
+                setattr(module, attribute, replacement)
+        yield
+    finally:
+        for module, attribute, value in reversed(originals):
+            setattr(module, attribute, value)
+
+
+@contextlib.contextmanager
+def record_footprints(cache: FootprintCache = FOOTPRINTS) -> Iterator[None]:
+    """Stores the size of every device routed by the fiber array wrappers.
+
+    Does nothing unless UBC2_RECORD_FOOTPRINTS is set.
+    """
+    if not is_recording():
+        yield
+        return
+
+    def record(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            component = func(*args, **kwargs)
+            cache.put(cache.get_key(func, args, kwargs), component.size)
+            return component
+
+        return wrapper
+
+    replacements = {}
+    for module_name, attribute in WRAPPERS:
+        func = getattr(importlib.import_module(module_name), attribute)
+        replacements[id(func)] = record
+    with patch(replacements):
+        yield
+
+
+@dataclass
+class DryRunResult:
+    """Predicted packing of one mask.
+
+    Args:
+        mask: label of the mask function.
+        bins: devices per bin for every pack call.
+        dies: names of the dies the mask would write.
+        cached: footprints found in the footprint cache.
+        estimated: footprints estimated analytically.
+        error: formatted traceback, None if the mask fits.
+        duration: wall time in seconds.
+    """
+
+    mask: str
+    bins: list[list[int]] = field(default_factory=list)
+    dies: list[str] = field(default_factory=list)
+    cached: int = 0
+    estimated: int = 0
+    error: str | None = None
+    duration: float = 0.0
+
+    @property
+    def dropped(self) -> bool:
+        """True if a pack call needed more bins than the mask writes dies."""
+        return any(len(bins) > len(self.dies) for bins in self.bins)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.dropped
+
+
+def pack_bboxes(
+    sizes: list[tuple[float, float]],
+    spacing: float = 10.0,
+    aspect_ratio: tuple[float, float] = (1.0, 1.0),
+    max_size: tuple[float | None, float | None] = (None, None),
+    sort_by_area: bool = True,
+    density: float = 1.1,
+    precision: float = 1e-2,
+) -> list[list[int]]:
+    """Returns the indices of sizes packed in each bin, same bins as gf.pack."""
+    import numpy as np
+    from gdsfactory.pack import _pack_single_bin
+
+    max_size = np.asarray(
+        [np.inf if v is None else v for v in max_size], dtype=np.float64
+    )
+    max_size = max_size / precision
+    rects = {}
+    for index, size in enumerate(sizes):
+        w, h = (np.asarray(size) + spacing) / precision
+        w, h = int(w), int(h)
+        if w > max_size[0] or h > max_size[1]:
+            raise ValueError(
+                f"pack() failed because device {index} has x or y dimension larger "
+                f"than `max_size` and cannot be packed.\nsize = "
+                f"{w * precision, h * precision}, max_size = {max_size * precision}"
+            )
+        rects[index] = (w, h)
+
+    bins = []
+    while rects:
+        packed, rects = _pack_single_bin(
+            rects,
+            aspect_ratio=aspect_ratio,
+            max_size=max_size,
+            sort_by_area=sort_by_area,
+            density=density,
+        )
+        bins.append(sorted(packed))
+    return bins
+
+
+def dry_run(
+    mask: Callable[[], Any], cache: FootprintCache = FOOTPRINTS
+) -> DryRunResult:
+    """Runs mask with predicted footprints and bbox packing, writing nothing.
+
+    Args:
+        mask: mask function, for example ubc_joaquin_matres1.test_mask1.
+        cache: footprints recorded by previous builds.
+    """
+    import gdsfactory as gf
+    from gdsfactory.cell import CACHE
+
+    from ubc2 import packing, sweep
+    from ubc2.build import get_mask_label
+    from ubc2.write_mask import write_mask_gds_with_metadata
+
+    result = DryRunResult(mask=get_mask_label(mask))
+    footprints: dict[str, gf.Component] = {}
+
+    def footprint(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache.get_key(func, args, kwargs)
+            if key not in footprints:
+                size = cache.get(key)
+                if size is None:
+                    component, _ = get_arguments(func, args, kwargs)
+                    size = estimate_footprint(func.__name__, component)
+                    result.estimated += 1
+                else:
+                    result.cached += 1
+                c = gf.Component(f"footprint_{key[:12]}")
+                c.add_polygon([(0, 0), (size[0], 0), size, (0, size[1])], layer=(0, 0))
+                footprints[key] = c
+            return footprints[key]
+
+        return wrapper
+
+    def bbox_pack(pack_sizes):
+        names = set(inspect.signature(pack_sizes).parameters)
+
+        def decorator(func):
+            def wrapper(component_list, **kwargs):
+                components = [gf.get_component(c) for c in component_list]
+                bins = pack_sizes(
+                    [c.size for c in components],
+                    **{k: v for k, v in kwargs.items() if k in names},
+                )
+                result.bins.append([len(b) for b in bins])
+                return [gf.Component(f"dry_run_bin_{i}") for i in range(len(bins))]
+
+            return wrapper
+
+        return decorator
+
+    def write(func):
+        def wrapper(m, *args, **kwargs):
+            result.dies.append(m.name)
+            return m
+
+        return wrapper
+
+    def serial(func):
+        def wrapper(cell, points, name, wrap, kwargs, *args, **options):
+            # worker processes would build the real devices
+            return sweep.build_serial(cell, points, name, wrap, kwargs)
+
+        return wrapper
+
+    replacements = {
+        id(gf.pack): bbox_pack(pack_bboxes),
+        id(sweep.build_parallel): serial,
+        id(packing.pack): bbox_pack(packing.pack_bins),
+        id(write_mask_gds_with_metadata): write,
+    }
+    for module_name, attribute in WRAPPERS:
+        func = getattr(importlib.import_module(module_name), attribute)
+        replacements[id(func)] = footprint
+
+    # placeholders and empty bins must not stay in the gdsfactory cell cache
+    names = set(CACHE)
+    t0 = time.perf_counter()
+    try:
+        with patch(replacements):
+            mask()
+    except Exception:
+        result.error = traceback.format_exc()
+    finally:
+        for name in set(CACHE) - names:
+            CACHE.pop(name, None)
+    result.duration = time.perf_counter() - t0
+    return result
+
+
+def print_result(result: DryRunResult) -> None:
+    if result.error:
+        status = result.error.strip().splitlines()[-1]
+    elif result.dropped:
+        bins = max(len(bins) for bins in result.bins)
+        status = f"needs {bins} dies, drops devices writing {len(result.dies)}"
+    else:
+        status = f"fits in {', '.join(result.dies)}"
+    print(
+        f"{'OK' if result.ok else 'FAILED':6s} {result.duration * 1e3:7.1f}ms "
+        f"{result.cached:3d} cached {result.estimated:3d} estimated "
+        f"{result.mask}: {status}"
+    )
+
+
+def test_pack_bboxes_matches_gf_pack() -> None:
+    import gdsfactory as gf
+
+    sizes = [(300, 200), (300, 200), (250, 150), (100, 400), (50, 50)]
+    components = [gf.components.rectangle(size=size, layer=(1, 0)) for size in sizes]
+    settings = dict(spacing=2, max_size=(605, 410))
+    bins = pack_bboxes(sizes, **settings)
+    packed = gf.pack(components, **settings)
+    assert len(bins) == len(packed)
+    assert [len(b) for b in bins] == [len(c.references) for c in packed]
+
+
+def test_record_footprints_is_opt_in(tmp_path, monkeypatch) -> None:
+    import ubcpdk.components
+
+    add_fiber_array = ubcpdk.components.add_fiber_array
+    cache = FootprintCache(tmp_path)
+    monkeypatch.delenv(ENV_RECORD, raising=False)
+    with record_footprints(cache):
+        assert ubcpdk.components.add_fiber_array is add_fiber_array
+    monkeypatch.setenv(ENV_RECORD, "1")
+    with record_footprints(cache):
+        assert ubcpdk.components.add_fiber_array is not add_fiber_array
+    assert ubcpdk.components.add_fiber_array is add_fiber_array
@@ -0,0 +1,239 @@
+"""Tile fill computed on an occupancy grid and placed as a few array references.
+
+gf.fill_rectangle draws every avoided polygon into a raster one at a time and
+places one array reference per run of free tiles in every row. Here polygons
+are rasterized on the tile grid with vectorized point-in-polygon and edge
+sampling, the margin is applied with a distance transform from the tiles
+polygons touch, and the free tiles are merged into rectangles, each placed as
+one array reference with rows and columns::
+
+    fill = fill_rectangle(rings, fill_layers=[LAYER.WG], fill_size=(0.5, 0.5))
+    _ = m << fill
+
+The tile grid is the one of gf.fill_rectangle, centered on the bbox.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Sequence
+from typing import Any
+
+import gdsfactory as gf
+import gdstk
+import numpy as np
+from gdsfactory.cell import Settings
+from gdsfactory.component import Component
+from gdsfactory.fill import fill_cell_rectangle
+from gdsfactory.typings import LayerSpecs
+from scipy import ndimage
+
+
+def get_grid(
+    bbox: np.ndarray, fill_size: tuple[float, float]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the x and y of the tile centers covering bbox."""
+    (x0, y0), (x1, y1) = bbox
+    dx, dy = fill_size
+    nx, ny = int((x1 - x0) // dx), int((y1 - y0) // dy)
+    xs = np.arange(nx) * dx + (x0 + x1 - (nx - 1) * dx) / 2
+    ys = np.arange(ny) * dy + (y0 + y1 - (ny - 1) * dy) / 2
+    return xs, ys
+
+
+def rasterize(
+    polygons: Sequence[np.ndarray], xs: np.ndarray, ys: np.ndarray
+) -> np.ndarray:
+    """Returns a (len(ys), len(xs)) grid, True where a tile touches a polygon.
+
+    A tile is occupied if its center is inside a polygon or an edge of the
+    polygon crosses it, so polygons thinner than a tile are not missed. Every
+    point of an edge is within a quarter tile in x and y of an edge sample, so
+    the tiles under the corners of that quarter tile box are all occupied.
+    """
+    dx, dy = xs[1] - xs[0] if len(xs) > 1 else 1, ys[1] - ys[0] if len(ys) > 1 else 1
+    occupied = np.zeros((len(ys), len(xs)), dtype=bool)
+    if not len(xs) or not len(ys):
+        return occupied
+
+    def index(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        i = np.floor((y - ys[0]) / dy + 0.5).astype(int)
+        j = np.floor((x - xs[0]) / dx + 0.5).astype(int)
+        return i, j
+
+    for points in polygons:
+        points = np.asarray(points)
+        # centers inside, only tested within the polygon bbox
+        (i0, j0), (i1, j1) = np.array(index(*points.min(axis=0))), np.array(
+            index(*points.max(axis=0))
+        )
+        i0, j0 = max(i0, 0), max(j0, 0)
+        i1, j1 = min(i1, len(ys) - 1), min(j1, len(xs) - 1)
+        if i0 > i1 or j0 > j1:
+            continue
+        x, y = np.meshgrid(xs[j0 : j1 + 1], ys[i0 : i1 + 1])
+        centers = np.stack([x.ravel(), y.ravel()], axis=1)
+        inside = np.array(gdstk.inside(centers, [points]), dtype=bool)
+        occupied[i0 : i1 + 1, j0 : j1 + 1] |= inside.reshape(x.shape)
+
+        # edges sampled at half a tile, all edges at once
+        start, end = points, np.roll(points, -1, axis=0)
+        lengths = np.hypot(*((end - start) / (dx, dy)).T)
+        counts = np.ceil(2 * lengths).astype(int) + 1
+        t = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = t / np.repeat(np.maximum(counts - 1, 1), counts)
+        samples = np.repeat(start, counts, axis=0) + t[:, None] * np.repeat(
+            end - start, counts, axis=0
+        )
+        for corner in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+            i, j = index(*(samples + np.multiply(corner, (dx, dy)) / 4).T)
+            keep = (i >= 0) & (i < len(ys)) & (j >= 0) & (j < len(xs))
+            occupied[i[keep], j[keep]] = True
+    return occupied
+
+
+def get_free(
+    occupied: np.ndarray, fill_size: tuple[float, float], margin: float
+) -> np.ndarray:
+    """Returns True for tiles at least margin away from every occupied tile.
+
+    Grown by one tile, occupied holds the neighbor of each occupied tile toward
+    any free tile, and the distance between the centers of a free tile and that
+    neighbor is the gap between the free tile and the occupied tile.
+    """
+    if not occupied.any():
+        return np.ones_like(occupied)
+    touched = ndimage.binary_dilation(occupied, structure=np.ones((3, 3)))
+    distance = ndimage.distance_transform_edt(~touched, sampling=fill_size[::-1])
+    return ~touched & (distance >= margin)
+
+
+def get_rectangles(free: np.ndarray) -> np.ndarray:
+    """Returns (row, column, rows, columns) of rectangles covering free.
+
+    Runs of free tiles in a row are merged with the same run in the rows above.
+    """
+    padded = np.pad(free, ((0, 0), (1, 1))).astype(np.int8)
+    rows, starts = np.nonzero(np.diff(padded, axis=1) == 1)
+    _, stops = np.nonzero(np.diff(padded, axis=1) == -1)
+    if not len(rows):
+        return np.zeros((0, 4), dtype=int)
+
+    order = np.lexsort((rows, stops, starts))
+    rows, starts, stops = rows[order], starts[order], stops[order]
+    new = np.ones(len(rows), dtype=bool)
+    new[1:] = (
+        (starts[1:] != starts[:-1])
+        | (stops[1:] != stops[:-1])
+        | (rows[1:] != rows[:-1] + 1)
+    )
+    first = np.flatnonzero(new)
+    counts = np.diff(np.append(first, len(rows)))
+    return np.stack(
+        [rows[first], starts[first], counts, (stops - starts)[first]], axis=1
+    )
+
+
+def get_polygons(component: Any, avoid_layers: LayerSpecs | None) -> list:
+    polygons = component.get_polygons(by_spec=True, as_array=False)
+    if avoid_layers is not None:
+        layers = {gf.get_layer(layer) for layer in avoid_layers}
+        polygons = {key: p for key, p in polygons.items() if key in layers}
+    return [polygon.points for p in polygons.values() for polygon in p]
+
+
+def fill_rectangle(
+    component: Any,
+    fill_layers: LayerSpecs,
+    fill_size: tuple[float, float] = (5.0, 5.0),
+    avoid_layers: LayerSpecs | None = None,
+    margin: float = 5.0,
+    fill_densities: float | Sequence[float] = 1.0,
+) -> Component:
+    """Returns tiles filling the bbox of component away from its polygons.
+
+    Args:
+        component: Component or reference to fill.
+        fill_layers: of the fill tiles.
+        fill_size: tile pitch in x and y.
+        avoid_layers: layers of component kept clear, defaults to all.
+        margin: between tiles and avoided polygons.
+        fill_densities: fraction of each tile filled, one per fill layer.
+    """
+    fill_layers = list(fill_layers)
+    if np.isscalar(fill_densities):
+        fill_densities = [fill_densities] * len(fill_layers)
+    settings = dict(
+        fill_layers=[tuple(gf.get_layer(layer)) for layer in fill_layers],
+        fill_size=tuple(fill_size),
+        avoid_layers=avoid_layers and [tuple(gf.get_layer(a)) for a in avoid_layers],
+        margin=margin,
+        fill_densities=list(fill_densities),
+    )
+    tile = fill_cell_rectangle(
+        size=fill_size,
+        layers=fill_layers,
+        densities=tuple(fill_densities),
+        inverted=(False,) * len(fill_layers),
+    )
+
+    xs, ys = get_grid(component.bbox, fill_size)
+    occupied = rasterize(get_polygons(component, avoid_layers), xs, ys)
+    free = get_free(occupied, fill_size, margin)
+
+    digest = hashlib.md5(tile.name.encode() + np.packbits(free).tobytes())
+    digest.update(np.array([xs[:1], ys[:1]]).tobytes())
+    c = Component(f"fill_{digest.hexdigest()[:8]}")
+    for row, column, rows, columns in get_rectangles(free):
+        ref = c.add_array(tile, columns=columns, rows=rows, spacing=fill_size)
+        ref.move((xs[column], ys[row]))
+    # as gf.cell records them, mask metadata reads the settings of every device
+    c.settings = Settings(
+        name=c.name,
+        function_name="fill_rectangle",
+        module=__name__,
+        full=settings,
+        changed=settings,
+    )
+    return c
+
+
+def test_fill_rectangle() -> None:
+    from shapely.geometry import Polygon
+    from shapely.ops import unary_union
+
+    c = gf.Component()
+    ring = c << gf.components.ring(radius=10, width=0.5, layer=(1, 0))
+    heater = c << gf.components.rectangle(size=(30, 4), layer=(11, 0))
+    heater.move((-15, -22))
+    _ = c << gf.components.rectangle(size=(60, 60), layer=(99, 0), centered=True)
+
+    fill = fill_rectangle(
+        c, fill_layers=[(1, 0)], fill_size=(0.5, 0.5), avoid_layers=[(1, 0)], margin=2
+    )
+    assert len(fill.references) < 100
+    tiles = unary_union([Polygon(p) for p in fill.get_polygons()])
+    # clear of the ring by the margin, but not by much more
+    assert 2 <= tiles.distance(Polygon(ring.get_polygons()[0])) < 2 + 0.5
+
+    # heater is on another layer, so it is filled over, and the ring center too
+    assert tiles.contains(Polygon(heater.get_polygons()[0]))
+    assert tiles.contains(Polygon([(-1, -1), (1, -1), (1, 1), (-1, 1)]))
+
+    # a thin tilted strip clips tile corners that no tile center is inside
+    c = gf.Component()
+    strip = c << gf.components.rectangle(size=(40, 0.1), layer=(1, 0))
+    strip.rotate(7).move((-20, 0.37))
+    _ = c << gf.components.rectangle(size=(60, 60), layer=(99, 0), centered=True)
+    for margin in (0, 2, 5):
+        fill = fill_rectangle(
+            c,
+            fill_layers=[(1, 0)],
+            fill_size=(0.5, 0.5),
+            avoid_layers=[(1, 0)],
+            margin=margin,
+        )
+        tiles = unary_union([Polygon(p) for p in fill.get_polygons()])
+        distance = tiles.distance(Polygon(strip.get_polygons()[0]))
+        # a free tile never borders an occupied one, so the gap is at least a tile
+        assert margin <= distance < max(margin, 0.5) + 0.5
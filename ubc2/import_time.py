@@ -0,0 +1,129 @@
+"""Import-time benchmark for ubc2 and its mask modules.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each
+module and reports the cumulative import time. Fails if a module goes over its
+budget or if a lightweight module (registry, CLI, build runner) starts importing
+the layout stack.
+
+.. code::
+
+    python -m ubc2.import_time
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from dataclasses import dataclass
+
+from ubc2.masks import MASKS
+
+# must import quickly and without the layout stack
+LIGHT_MODULES = (
+    "ubc2",
+    "ubc2.config",
+    "ubc2.masks",
+    "ubc2.cli",
+    "ubc2.build",
+    "ubc2.manifest",
+    "ubc2.cell_cache",
+    "ubc2.profiler",
+    "ubc2.memory",
+    "ubc2.shard",
+    "ubc2.metadata",
+)
+HEAVY_PACKAGES = ("gdsfactory", "ubcpdk", "omegaconf", "gdstk", "klayout")
+BASELINE_MODULE = "ubcpdk"
+
+# seconds
+BUDGET_LIGHT = 0.2
+# seconds on top of importing BASELINE_MODULE
+BUDGET_MASK_MODULE = 0.5
+
+
+@dataclass
+class ImportTime:
+    """Import time of one module in a fresh interpreter.
+
+    Args:
+        module: module name.
+        cumulative: seconds to import the module and its dependencies.
+        imported: names of all modules imported.
+    """
+
+    module: str
+    cumulative: float
+    imported: tuple[str, ...]
+
+    def imports_any(self, packages: tuple[str, ...]) -> list[str]:
+        return sorted({name.split(".")[0] for name in self.imported} & set(packages))
+
+
+def get_import_time(module: str) -> ImportTime:
+    """Returns import time of module measured with `python -X importtime`."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = 0.0
+    imported = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = (field.strip() for field in line[12:].split("|"))
+        imported.append(name)
+        if name == module:
+            cumulative = int(cumulative_us) * 1e-6
+    return ImportTime(module=module, cumulative=cumulative, imported=tuple(imported))
+
+
+def get_mask_modules() -> list[str]:
+    return sorted({entry_point.split(":")[0] for entry_point in MASKS.values()})
+
+
+def check_import_times(
+    budget_light: float = BUDGET_LIGHT,
+    budget_mask_module: float = BUDGET_MASK_MODULE,
+) -> list[str]:
+    """Prints import times and returns a list of budget violations."""
+    errors = []
+
+    for module in LIGHT_MODULES:
+        result = get_import_time(module)
+        print(f"{result.cumulative:7.3f}s {module}")
+        heavy = result.imports_any(HEAVY_PACKAGES)
+        if heavy:
+            errors.append(f"{module} imports {heavy}")
+        if result.cumulative > budget_light:
+            errors.append(
+                f"{module} takes {result.cumulative:.3f}s > {budget_light:.3f}s"
+            )
+
+    baseline = get_import_time(BASELINE_MODULE).cumulative
+    print(f"{baseline:7.3f}s {BASELINE_MODULE} (baseline)")
+
+    for module in get_mask_modules():
+        result = get_import_time(module)
+        extra = result.cumulative - baseline
+        print(f"{result.cumulative:7.3f}s {module} ({extra:+.3f}s)")
+        if extra > budget_mask_module:
+            errors.append(
+                f"{module} takes {extra:.3f}s > {budget_mask_module:.3f}s "
+                f"on top of {BASELINE_MODULE}"
+            )
+    return errors
+
+
+def test_light_modules_do_not_import_layout_stack() -> None:
+    for module in LIGHT_MODULES:
+        heavy = get_import_time(module).imports_any(HEAVY_PACKAGES)
+        assert not heavy, f"{module} imports {heavy}"
+
+
+if __name__ == "__main__":
+    errors = check_import_times()
+    for error in errors:
+        print(f"FAILED: {error}")
+    sys.exit(int(bool(errors)))
@@ -0,0 +1,206 @@
+"""Build manifest for incremental mask builds.
+
+Each mask entry point gets a fingerprint from its resolved arguments, the source of
+the ubc2 modules it depends on, the installed ubcpdk/gdsfactory versions and the
+layout file format.
+Masks whose fingerprint did not change since the last build can be skipped.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+from collections.abc import Callable
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+from ubc2.config import DIE_SUFFIXES, MASK_FORMATS, get_mask_format
+
+MANIFEST_FILENAME = "manifest.json"
+PACKAGES = ("gdsfactory", "ubcpdk")
+
+
+def get_package_versions(packages: tuple[str, ...] = PACKAGES) -> dict[str, str]:
+    """Returns installed versions for packages."""
+    versions = {}
+    for package in packages:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = "missing"
+    return versions
+
+
+def get_output_files(dirpath: Path, gdspath: Path) -> list[Path]:
+    """Returns the files in dirpath written for a mask and its overflow dies."""
+    stem = Path(gdspath).stem
+    patterns = (f"{stem}.*", f"{stem}[{DIE_SUFFIXES}].*")
+    return sorted(p for pattern in patterns for p in Path(dirpath).glob(pattern))
+
+
+def is_layout(name: str | Path) -> bool:
+    """Returns True for GDS and OASIS files."""
+    return Path(name).suffix[1:] in MASK_FORMATS
+
+
+def clean_value(value: Any) -> Any:
+    """Returns a deterministic JSON-serializable version of a value."""
+    if isinstance(value, functools.partial):
+        return {
+            "function": clean_value(value.func),
+            "args": clean_value(value.args),
+            "kwargs": clean_value(value.keywords),
+        }
+    if isinstance(value, dict):
+        return {str(k): clean_value(v) for k, v in sorted(value.items())}
+    if isinstance(value, list | tuple | set | frozenset):
+        values = [clean_value(v) for v in value]
+        return (
+            sorted(values, key=repr) if isinstance(value, set | frozenset) else values
+        )
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, int | float | str | bool | type(None)):
+        return value
+    return repr(value)
+
+
+def get_local_modules(module: ModuleType, package: str = "ubc2") -> list[ModuleType]:
+    """Returns module and all package modules it uses, directly or indirectly."""
+    seen: dict[str, ModuleType] = {}
+    pending = [module]
+
+    while pending:
+        module = pending.pop()
+        if module.__name__ in seen:
+            continue
+        seen[module.__name__] = module
+
+        for value in vars(module).values():
+            if isinstance(value, ModuleType):
+                name = value.__name__
+            else:
+                name = getattr(value, "__module__", None)
+            if (
+                isinstance(name, str)
+                and name.split(".")[0] == package
+                and name in sys.modules
+            ):
+                pending.append(sys.modules[name])
+
+    return [seen[name] for name in sorted(seen)]
+
+
+def get_source_hash(module: ModuleType) -> str:
+    """Returns the sha256 of a module source file."""
+    return hashlib.sha256(Path(module.__file__).read_bytes()).hexdigest()
+
+
+def get_mask_fingerprint(
+    mask: Callable[..., Any], mask_format: str | None = None
+) -> str:
+    """Returns a hash that changes whenever the mask output could change.
+
+    Args:
+        mask: mask function or partial of a mask function.
+        mask_format: gds or oas. Defaults to UBC2_MASK_FORMAT, or gds.
+    """
+    func = mask
+    args: tuple[Any, ...] = ()
+    kwargs: dict[str, Any] = {}
+    while isinstance(func, functools.partial):
+        args = func.args + args
+        kwargs = {**func.keywords, **kwargs}
+        func = func.func
+
+    bound = inspect.signature(func).bind_partial(*args, **kwargs)
+    bound.apply_defaults()
+
+    module = sys.modules[func.__module__]
+    data = {
+        "function": f"{func.__module__}.{func.__qualname__}",
+        "arguments": clean_value(dict(bound.arguments)),
+        "sources": {m.__name__: get_source_hash(m) for m in get_local_modules(module)},
+        "versions": get_package_versions(),
+        "mask_format": mask_format or get_mask_format(),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class Manifest:
+    """Maps mask labels to their fingerprint and output files.
+
+    Args:
+        dirpath: mask directory where the manifest lives next to the outputs.
+    """
+
+    def __init__(self, dirpath: Path) -> None:
+        self.dirpath = Path(dirpath)
+        self.filepath = self.dirpath / MANIFEST_FILENAME
+        self.entries: dict[str, dict[str, Any]] = (
+            json.loads(self.filepath.read_text()) if self.filepath.exists() else {}
+        )
+
+    def is_up_to_date(self, label: str, fingerprint: str) -> bool:
+        """Returns True if mask was built with fingerprint and its outputs exist."""
+        entry = self.entries.get(label)
+        return bool(
+            entry
+            and entry["fingerprint"] == fingerprint
+            and all((self.dirpath / name).exists() for name in entry["files"])
+        )
+
+    def get_gdspath(self, label: str) -> Path:
+        return self.dirpath / self.entries[label]["gdspath"]
+
+    def update(
+        self,
+        label: str,
+        fingerprint: str,
+        gdspath: Path,
+        duration: float | None = None,
+    ) -> None:
+        """Records the outputs and build time of a freshly built mask."""
+        gdspath = Path(gdspath)
+        files = [
+            p.relative_to(self.dirpath).as_posix()
+            for p in get_output_files(self.dirpath, gdspath)
+        ]
+        self.entries[label] = dict(
+            fingerprint=fingerprint, gdspath=gdspath.name, files=files
+        )
+        if duration is not None:
+            self.entries[label]["duration"] = round(duration, 3)
+
+    def get_durations(self) -> dict[str, float]:
+        """Returns the recorded build time in seconds of each mask label."""
+        return {
+            label: entry["duration"]
+            for label, entry in self.entries.items()
+            if "duration" in entry
+        }
+
+    def remove(self, label: str) -> None:
+        self.entries.pop(label, None)
+
+    def remove_outputs(self, label: str) -> None:
+        """Deletes the recorded outputs of a mask, for example before a rebuild."""
+        entry = self.entries.pop(label, None)
+        if not entry:
+            return
+        links = [f"gds/{name}" for name in entry["files"] if is_layout(name)]
+        for name in entry["files"] + links:
+            (self.dirpath / name).unlink(missing_ok=True)
+
+    def write(self) -> Path:
+        """Writes the manifest by replacing the file, never modifying it in place."""
+        filepath_tmp = self.filepath.with_suffix(".tmp")
+        filepath_tmp.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+        os.replace(filepath_tmp, self.filepath)
+        return self.filepath
@@ -0,0 +1,56 @@
+"""Registry of masks keyed by output mask name.
+
+Entry points are stored as "module:function" strings so listing masks or building
+one of them only imports the module that defines it.
+"""
+
+from __future__ import annotations
+
+import importlib
+from collections.abc import Callable
+from pathlib import Path
+
+MASKS: dict[str, str] = {
+    "EBeam_JoaquinMatres_11": "ubc2.ubc_joaquin_matres1:test_mask1",
+    "EBeam_JoaquinMatres_12": "ubc2.ubc_joaquin_matres1:test_mask2",
+    "EBeam_JoaquinMatres_13": "ubc2.ubc_joaquin_matres1:test_mask3",
+    "EBeam_JoaquinMatres_14": "ubc2.ubc_joaquin_matres1:test_mask4",
+    "EBeam_JoaquinMatres_15": "ubc2.ubc_joaquin_matres1:test_mask5",
+    "EBeam_JoaquinMatres_16": "ubc2.ubc_joaquin_matres1:test_mask6",
+    "EBeam_JoaquinMatres_17": "ubc2.ubc_joaquin_matres1:test_mask7",
+    "EBeam_JoaquinMatres_Helge_1": "ubc2.ubc_helge:test_mask1",
+    "EBeam_JoaquinMatres_Helge_2": "ubc2.ubc_helge:test_mask2",
+    "EBeam_heaters_JoaquinMatres_Simon_0": "ubc2.ubc_simon:test_mask1",
+    "EBeam_heaters_JoaquinMatres_Simon_1": "ubc2.ubc_simon:test_mask3",
+    "EBeam_heaters_JoaquinMatres_Simon_2": "ubc2.ubc_simon:test_mask4",
+    "EBeam_heaters_JoaquinMatres_Simon_3": "ubc2.ubc_simon:test_mask5",
+    "EBeam_simbilod_20": "ubc2.ubc_simon_bends:test_mask_bends_circular",
+    "EBeam_simbilod_21": "ubc2.ubc_simon_bends:test_mask_bends_euler",
+    "EBeam_simbilod_10": "ubc2.ubc_simon_loss:test_mask_continuum1",
+    "EBeam_simbilod_11": "ubc2.ubc_simon_loss:test_mask_continuum2",
+    "EBeam_simbilod_12": "ubc2.ubc_simon_loss:test_mask_continuum3",
+    "EBeam_simbilod_30": "ubc2.ubc_simon_rings:test_mask_rings_1",
+    "EBeam_simbilod_31": "ubc2.ubc_simon_rings:test_mask_rings_2",
+    "EBeam_simbilod_32": "ubc2.ubc_simon_rings:test_mask_rings_3",
+    "EBeam_simbilod_40": "ubc2.ubc_simon_dcs:test_mask_dcs_1",
+    "EBeam_simbilod_41": "ubc2.ubc_simon_dcs:test_mask_dcs_2",
+    "EBeam_simbilod_42": "ubc2.ubc_simon_dcs:test_mask_dcs_3",
+    "EBeam_simbilod_43": "ubc2.ubc_simon_dcs:test_mask_dcs_4",
+    "EBeam_simbilod_44": "ubc2.ubc_simon_dcs:test_mask_dcs_5",
+    "EBeam_simbilod_45": "ubc2.ubc_simon_dcs:test_mask_dcs_6",
+    "EBeam_heaters_JoaquinMatres_14": "ubc2.ubc_joaquin_matres_heaters:test_mzi_heater",
+    "EBeam_heaters_JoaquinMatres_15": "ubc2.ubc_joaquin_matres_heaters:test_ring_heater",
+}
+
+
+def get_mask(name: str) -> Callable[[], Path]:
+    """Returns the function that builds mask name, importing only its module.
+
+    Args:
+        name: output mask name, for example EBeam_simbilod_42.
+    """
+    if name not in MASKS:
+        raise ValueError(f"Unknown mask {name!r}, registered masks are {list(MASKS)}")
+    module_name, function_name = MASKS[name].split(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)
@@ -0,0 +1,105 @@
+"""Keep memory bounded when building many masks in one process.
+
+gdsfactory keeps every component it ever built in its global cell CACHE, so peak
+memory grows with every mask a process builds. `release_cells` drops the cells that
+only the last mask used, while keeping the shared PDK cells pinned.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import gc
+import os
+import resource
+import sys
+from typing import Any
+
+# shared PDK cells that every mask uses, never released
+PINNED_FUNCTIONS = {
+    "gc_te1550",
+    "gc_te1550_broadband",
+    "gc_tm1550",
+    "pad",
+    "ebeam_y_1550",
+    "ebeam_bdc_te1550",
+    "ebeam_crossing4",
+    "bend_euler",
+    "bend_euler180",
+    "bend_circular",
+    "taper",
+}
+
+
+def get_rss() -> int:
+    """Returns current resident set size in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return get_peak_rss()
+
+
+def get_peak_rss() -> int:
+    """Returns peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def is_pinned(component: Any) -> bool:
+    """Returns True for shared PDK cells.
+
+    Pinned are cells from PINNED_FUNCTIONS and fixed ubcpdk cells built with
+    default arguments, for example imported GDS cells like gc_te1550.
+    """
+    settings = getattr(component, "settings", None)
+    function_name = getattr(settings, "function_name", None)
+    module = getattr(settings, "module", None) or ""
+    changed = getattr(settings, "changed", None)
+    return function_name in PINNED_FUNCTIONS or (
+        module.startswith("ubcpdk") and not changed
+    )
+
+
+def release_cells() -> int:
+    """Removes unpinned cells from the gdsfactory CACHE and returns how many.
+
+    Pinned cells keep their whole hierarchy in the CACHE, so no cell name is ever
+    built twice while an older copy is still referenced.
+    """
+    from gdsfactory.component import name_counters
+
+    from ubc2.cell_cache import clear_loaded
+
+    cell_module = sys.modules["gdsfactory.cell"]
+    cache = cell_module.CACHE
+
+    keep = {}
+    for name, component in cache.items():
+        if is_pinned(component):
+            keep[name] = component
+            for child in component.get_dependencies(recursive=True):
+                if child.name in cache:
+                    keep[child.name] = cache[child.name]
+
+    released = [name for name in cache if name not in keep]
+    # update in place: the profiler may have swapped in its own dict
+    cache.clear()
+    cache.update(keep)
+    cell_module.CACHE_IDS.intersection_update(id(c) for c in keep.values())
+    for name in released:
+        name_counters.pop(name, None)
+    clear_loaded()
+
+    gc.collect()
+    trim()
+    return len(released)
+
+
+def trim() -> None:
+    """Returns freed heap memory to the OS where the C library supports it."""
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
@@ -0,0 +1,100 @@
+"""Device metadata sidecar in JSON Lines, one row per device placed on a mask.
+
+The YAML metadata written next to each mask holds every cell of the hierarchy and
+is slow to parse. The sidecar `{mask}.devices.jsonl` only holds the devices placed
+on the mask, each row with the device name, function, settings, info, placed
+ports and bounding box::
+
+    {"name": "ring_single_...", "function": "add_fiber_array", "settings": ...}
+
+Rows are sorted by name and start with the name, so `load_devices` selects devices
+by name prefix comparing raw lines and only parses the matching ones.
+
+.. code::
+
+    rows = load_devices("build/mask/EBeam_simbilod_30.devices.jsonl", prefix="ring")
+    wafer = load_wafer("build/mask", prefix="ring_single")
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+SUFFIX = ".devices.jsonl"
+
+
+def get_devices(component) -> list[dict[str, Any]]:
+    """Returns one row per reference placed in the top level of component."""
+    from gdsfactory.serialization import clean_value_json
+
+    rows = []
+    for reference in component.references:
+        cell = reference.parent
+        settings = cell.settings
+        rows.append(
+            dict(
+                name=cell.name,
+                function=settings.function_name,
+                module=settings.module,
+                settings=clean_value_json(settings.full),
+                child=clean_value_json(settings.child),
+                info=clean_value_json(dict(cell.info)),
+                ports={name: port.to_dict() for name, port in reference.ports.items()},
+                bbox=[[round(float(v), 3) for v in xy] for xy in reference.bbox],
+            )
+        )
+    return rows
+
+
+def write_devices(component, filepath: Path) -> Path:
+    """Writes the devices of component as JSON Lines sorted by name."""
+    # rows start with the name, so sorting lines sorts by name
+    lines = sorted(
+        json.dumps(row, separators=(",", ":")) for row in get_devices(component)
+    )
+    filepath = Path(filepath)
+    filepath.write_text("".join(f"{line}\n" for line in lines))
+    return filepath
+
+
+def load_devices(filepath: Path, prefix: str = "") -> list[dict[str, Any]]:
+    """Returns the devices whose name starts with prefix.
+
+    Only lines starting with the prefix are parsed, and reading stops after the
+    last match since rows are sorted by name.
+    """
+    # rows start with {"name":"<name>, so match the JSON encoded prefix
+    start = '{"name":' + json.dumps(prefix)[:-1]
+    rows = []
+    with open(filepath) as f:
+        for line in f:
+            if line.startswith(start):
+                rows.append(json.loads(line))
+            elif rows:
+                break
+    return rows
+
+
+def load_wafer(dirpath: Path, prefix: str = "") -> dict[str, list[dict[str, Any]]]:
+    """Returns devices whose name starts with prefix for every mask in dirpath."""
+    return {
+        filepath.name[: -len(SUFFIX)]: load_devices(filepath, prefix=prefix)
+        for filepath in sorted(Path(dirpath).glob(f"*{SUFFIX}"))
+    }
+
+
+def test_load_devices_prefix(tmp_path: Path) -> None:
+    import gdsfactory as gf
+
+    c = gf.Component("test_load_devices_prefix")
+    c << gf.components.straight(length=10)
+    c << gf.components.straight(length=20)
+    c << gf.components.bend_euler()
+    filepath = write_devices(c, tmp_path / f"mask{SUFFIX}")
+
+    assert len(load_devices(filepath)) == 3
+    straights = load_devices(filepath, prefix="straight")
+    assert [row["function"] for row in straights] == ["straight", "straight"]
+    assert load_devices(filepath, prefix="mmi") == []
@@ -0,0 +1,175 @@
+"""Pack devices into as few dies as possible.
+
+gf.pack fills one bin at a time with a single rectpack heuristic, growing the bin
+from the total device area. `pack` here packs all bins at once with several
+rectpack placement heuristics and sort orders, and keeps the layout that needs the
+fewest dies, then the one that leaves the least in the last die. The returned
+Components are placed like gf.pack places them, so masks can switch between both.
+
+.. code::
+
+    dies = pack(components, max_size=(605, 410), spacing=2)
+"""
+
+from __future__ import annotations
+
+import itertools
+from collections.abc import Sequence
+from typing import Any
+
+# placement heuristics and sort orders tried, by rectpack name
+PACK_ALGOS = (
+    "MaxRectsBssf",
+    "MaxRectsBaf",
+    "MaxRectsBlsf",
+    "MaxRectsBl",
+    "SkylineMwfl",
+    "SkylineBl",
+    "GuillotineBssfSas",
+)
+SORT_ALGOS = ("SORT_AREA", "SORT_PERI", "SORT_DIFF", "SORT_SSIDE", "SORT_LSIDE")
+BIN_ALGOS = ("BFF", "Global")
+
+# index, x, y in rectangles of precision units
+Placement = tuple[int, int, int]
+
+
+def _pack(
+    rects: dict[int, tuple[int, int]],
+    max_size: tuple[int, int],
+    pack_algo: str,
+    sort_algo: str,
+    bin_algo: str,
+) -> list[list[Placement]]:
+    import rectpack
+
+    packer = rectpack.newPacker(
+        mode=rectpack.PackingMode.Offline,
+        bin_algo=getattr(rectpack.PackingBin, bin_algo),
+        pack_algo=getattr(rectpack, pack_algo),
+        sort_algo=getattr(rectpack, sort_algo),
+        rotation=False,
+    )
+    for index, (w, h) in rects.items():
+        packer.add_rect(w, h, rid=index)
+    packer.add_bin(*max_size, count=float("inf"))
+    packer.pack()
+
+    bins: list[list[Placement]] = []
+    for b, x, y, _, _, index in packer.rect_list():
+        bins += [[] for _ in range(b + 1 - len(bins))]
+        bins[b].append((index, x, y))
+    return [sorted(placements) for placements in bins if placements]
+
+
+def pack_bins(
+    sizes: Sequence[tuple[float, float]],
+    max_size: tuple[float, float],
+    spacing: float = 2.0,
+    precision: float = 1e-2,
+) -> list[list[tuple[int, float, float]]]:
+    """Returns the index and lower left corner of each size, bin by bin.
+
+    Corners are offset by half the spacing, so devices also keep spacing / 2 from
+    the die edges.
+
+    Args:
+        sizes: (width, height) of each device.
+        max_size: die (width, height).
+        spacing: between devices.
+        precision: grid the packer works on.
+    """
+    bin_size = (int(max_size[0] / precision), int(max_size[1] / precision))
+    rects = {}
+    for index, (width, height) in enumerate(sizes):
+        w = int((width + spacing) / precision)
+        h = int((height + spacing) / precision)
+        if w > bin_size[0] or h > bin_size[1]:
+            raise ValueError(
+                f"Device {index} of size {width, height} is larger than the die "
+                f"{max_size} and cannot be packed."
+            )
+        rects[index] = (w, h)
+    if not rects:
+        return []
+
+    def score(bins: list[list[Placement]]) -> tuple[int, int]:
+        last = sum(rects[index][0] * rects[index][1] for index, _, _ in bins[-1])
+        return len(bins), last
+
+    best = None
+    for algos in itertools.product(PACK_ALGOS, SORT_ALGOS, BIN_ALGOS):
+        bins = _pack(rects, bin_size, *algos)
+        if best is None or score(bins) < score(best):
+            best = bins
+        # every layout on one die scores the same
+        if len(best) == 1:
+            break
+    offset = spacing / 2
+    return [
+        [(index, x * precision + offset, y * precision + offset) for index, x, y in b]
+        for b in best
+    ]
+
+
+def pack(
+    component_list: Sequence[Any],
+    max_size: tuple[float, float],
+    spacing: float = 2.0,
+    precision: float = 1e-2,
+    name_prefix: str = "pack",
+) -> list:
+    """Returns one Component per die with the devices packed into it.
+
+    Ports are added with their own names, and suffixed with the device index if
+    the name is already taken, like gf.pack with add_ports_prefix=False.
+
+    Args:
+        component_list: devices to pack.
+        max_size: die (width, height).
+        spacing: between devices.
+        precision: grid the packer works on.
+        name_prefix: of each die Component.
+    """
+    import gdsfactory as gf
+    from gdsfactory.snap import snap_to_grid
+
+    components = [gf.get_component(component) for component in component_list]
+    bins = pack_bins([c.size for c in components], max_size, spacing, precision)
+
+    dies = []
+    for i, placements in enumerate(bins):
+        die = gf.Component(f"{name_prefix}_{i}", with_uuid=True)
+        die.info["components"] = {}
+        for index, x, y in placements:
+            component = components[index]
+            ref = die << component
+            if hasattr(component, "settings"):
+                die.info["components"][component.name] = dict(component.settings)
+            ref.move(snap_to_grid((x - ref.xmin, y - ref.ymin)))
+            try:
+                die.add_ports(ref.ports)
+            except ValueError:
+                die.add_ports(ref.ports, suffix=f"_{index}")
+        dies.append(die)
+    return dies
+
+
+def test_pack_fewer_dies_than_gf_pack() -> None:
+    import gdsfactory as gf
+
+    # fiber array footprints of a sweep that gf.pack spreads over 3 dies
+    a, b, c = (150, 148.4), (300, 148.4), (200, 402.4)
+    sizes = [a, c, a, b, b, a, b, a, a]
+    components = [
+        gf.components.rectangle(size=size, layer=(1, 0), port_type=None)
+        for size in sizes
+    ]
+    max_size = (605, 410)
+    dies = pack(components, max_size=max_size)
+    assert len(gf.pack(components, max_size=max_size, spacing=2)) == 3
+    assert len(dies) == 2
+    assert sum(len(die.references) for die in dies) == len(sizes)
+    for die in dies:
+        assert die.xmin >= 0 and die.ymin >= 0
+        assert die.xmax <= max_size[0] and die.ymax <= max_size[1]
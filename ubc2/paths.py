@@ -0,0 +1,195 @@
+"""Sample paths for extruded transitions to a geometric tolerance.
+
+gf.path.extrude_transition evaluates the width and offset of every section at
+the points of the path, so a straight path with a fixed npoints puts as many
+vertices where the section hardly changes as where it changes fast.
+`sample_transition` returns a straight path whose points are placed by bisection
+until every section edge stays within the tolerance of the exact curve::
+
+    p = sample_transition(transition, length=50, tolerance=1e-3)
+    c = gf.path.extrude_transition(p, transition)
+
+Sections with `simplify` set drop the points they do not need, such as a
+waveguide of constant width extruded next to a tapered slab.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+import numpy as np
+
+# uniform intervals bisected from, several per sine period so none is missed
+MIN_INTERVALS = 8
+# bisections of an interval before giving up on the tolerance
+MAX_DEPTH = 30
+# where each interval is probed, as a fraction of its length
+PROBES = np.array([0.25, 0.5, 0.75])
+# points of the arc length table of section offset curves
+ARC_POINTS = 4097
+
+
+def get_arc_fraction(
+    offset: Callable[[np.ndarray], np.ndarray], length: float
+) -> Callable[[np.ndarray], np.ndarray]:
+    """Returns the fraction of the arc length of y = offset(t), x = t * length."""
+    u = np.linspace(0, 1, ARC_POINTS)
+    arc = np.cumsum(np.hypot(np.diff(u) * length, np.diff(offset(u) * np.ones_like(u))))
+    arc = np.concatenate([[0], arc])
+    return lambda t: np.interp(t, u, arc / arc[-1])
+
+
+# the interpolations and section names of gf.path.extrude_transition, copied from
+# gdsfactory 7.8.12 where they are private, see test_get_edges_matches_extrude_transition
+def transition_sine(y1: float, y2: float) -> Callable[[np.ndarray], np.ndarray]:
+    return lambda t: y1 + (1 - np.cos(np.pi * t)) / 2 * (y2 - y1)
+
+
+def transition_parabolic(y1: float, y2: float) -> Callable[[np.ndarray], np.ndarray]:
+    return lambda t: y1 + np.sqrt(t) * (y2 - y1)
+
+
+def transition_linear(y1: float, y2: float) -> Callable[[np.ndarray], np.ndarray]:
+    return lambda t: y1 + t * (y2 - y1)
+
+
+WIDTH_TYPES = {
+    "linear": transition_linear,
+    "sine": transition_sine,
+    "parabolic": transition_parabolic,
+}
+
+
+def get_named_sections(sections) -> dict:
+    """Returns sections by name, or by layer for unnamed sections."""
+    from gdsfactory.pdk import get_layer
+
+    named = {}
+    for section in sections:
+        name = section.name or get_layer(section.layer)
+        if name in named:
+            raise ValueError(f"Duplicate section name or layer {name!r} in transition")
+        named[name] = section
+    return named
+
+
+def get_edges(transition, length: float) -> Callable[[np.ndarray], np.ndarray]:
+    """Returns the offsets of all section edges at t in [0, 1] along transition.
+
+    Mirrors the width and offset interpolation of gf.path.extrude_transition,
+    which evaluates the width of a section at the arc length along its offset
+    curve. The offsets have the opposite sign of the extruded edges.
+    """
+    sections1 = get_named_sections(transition.cross_section1.sections)
+    sections2 = get_named_sections(transition.cross_section2.sections)
+
+    functions = []
+    for name in set(sections1).intersection(sections2):
+        section1, section2 = sections1[name], sections2[name]
+        offset1, offset2 = section1.offset, section2.offset
+        width1, width2 = section1.width, section2.width
+        offset1 = offset1(1) if callable(offset1) else offset1
+        offset2 = offset2(0) if callable(offset2) else offset2
+        width1 = width1(1) if callable(width1) else width1
+        width2 = width2(0) if callable(width2) else width2
+        offset = transition_sine(offset1, offset2)
+        width = WIDTH_TYPES[transition.width_type](width1, width2)
+        fraction = get_arc_fraction(offset, length)
+        functions += [offset, lambda t, width=width, f=fraction: width(f(t))]
+
+    def edges(t: np.ndarray) -> np.ndarray:
+        t = np.asarray(t, dtype=float)
+        values = [f(t) * np.ones_like(t) for f in functions]
+        return np.concatenate(
+            [[o + w / 2, o - w / 2] for o, w in zip(values[::2], values[1::2])]
+        )
+
+    return edges
+
+
+def sample(
+    edges: Callable[[np.ndarray], np.ndarray], length: float, tolerance: float
+) -> np.ndarray:
+    """Returns t in [0, 1] so that joining edges(t) stays within tolerance.
+
+    Intervals are probed at PROBES, and those where an edge deviates from the
+    chord by more than tolerance are bisected, all intervals at once.
+    """
+    t = np.linspace(0, 1, MIN_INTERVALS + 1)
+    for _ in range(MAX_DEPTH):
+        a, b = t[:-1], t[1:]
+        ya, yb = edges(a), edges(b)
+        deviation = np.zeros(len(a))
+        for fraction in PROBES:
+            chord = ya + (yb - ya) * fraction
+            exact = edges(a + (b - a) * fraction)
+            deviation = np.maximum(deviation, np.abs(exact - chord).max(axis=0))
+        # the deviation across the path bounds the distance to the chord
+        split = (deviation > tolerance) & ((b - a) * length > tolerance)
+        if not split.any():
+            break
+        t = np.sort(np.concatenate([t, (a[split] + b[split]) / 2]))
+    return t
+
+
+def sample_transition(transition, length: float, tolerance: float = 1e-3):
+    """Returns a straight path to extrude transition with edges within tolerance.
+
+    Args:
+        transition: from gf.path.transition.
+        length: of the path in um.
+        tolerance: maximum distance in um between the extruded edges and the exact
+            edges of the transition.
+    """
+    import gdsfactory as gf
+
+    t = sample(get_edges(transition, length), length, tolerance)
+    return gf.Path(np.stack([t * length, np.zeros_like(t)], axis=1))
+
+
+def test_sample_transition_tolerance() -> None:
+    import gdsfactory as gf
+    import shapely.geometry as sg
+
+    xs1 = gf.cross_section.strip(width=0.5)
+    xs2 = gf.cross_section.strip(width=10)
+    transition = gf.path.transition(xs1, xs2, width_type="sine")
+    tolerance = 1e-3
+
+    p = sample_transition(transition, length=50, tolerance=tolerance)
+    exact = gf.path.straight(length=50, npoints=20000)
+    coarse = gf.path.extrude_transition(p, transition).get_polygons()[0]
+    fine = gf.path.extrude_transition(exact, transition).get_polygons()[0]
+
+    assert len(coarse) < len(fine) / 20
+    distance = sg.Polygon(fine).exterior.hausdorff_distance(sg.Polygon(coarse))
+    # both polygons are snapped to the 1 nm grid
+    assert distance < tolerance + 1e-3
+
+
+def test_get_edges_matches_extrude_transition() -> None:
+    import gdsfactory as gf
+
+    side = dict(layer=(2, 0), name="side")
+    xs1 = gf.cross_section.strip(
+        width=0.5, sections=(gf.Section(width=1, offset=2, **side),)
+    )
+    xs2 = gf.cross_section.strip(
+        width=4, sections=(gf.Section(width=3, offset=5, **side),)
+    )
+    for width_type in WIDTH_TYPES:
+        transition = gf.path.transition(xs1, xs2, width_type=width_type)
+        p = gf.path.straight(length=10, npoints=101)
+        c = gf.path.extrude_transition(p, transition)
+        for polygon in c.get_polygons():
+            # vertex i of one side and vertex i of the other, reversed, are the
+            # ends of the width across the section center at the same point
+            n = len(polygon) // 2
+            a, b = polygon[:n], polygon[::-1][:n]
+            edges = get_edges(transition, 10)((a[:, 0] + b[:, 0]) / 2 / 10)
+            # gf offsets to the right of the path, the sign does not matter here
+            offsets = np.abs(edges[::2] + edges[1::2]) / 2
+            widths = edges[::2] - edges[1::2]
+            errors = np.abs(offsets - np.abs(a[:, 1] + b[:, 1]) / 2).max(axis=1)
+            errors += np.abs(widths - np.hypot(*(a - b).T)).max(axis=1)
+            assert errors.min() < 2e-3, width_type
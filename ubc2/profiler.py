@@ -0,0 +1,301 @@
+"""Per-stage profiler for mask builds.
+
+Records wall time, CPU time and (optionally) allocation peaks for each stage of a
+mask build, and counts @gf.cell invocations and cache hits per cell name.
+Results export as JSON and as Chrome trace format (open in chrome://tracing or
+https://ui.perfetto.dev).
+
+Stages come from two places:
+
+- explicit `with stage("write_gds"):` blocks, for example in write_mask.
+- gdsfactory and ubcpdk functions (pack, fill_rectangle, routing, fiber array
+  wrappers) instrumented by `PROFILER.enable()`. Enable before importing the mask
+  modules so their module-level aliases (`add_gc = ...`) pick up the wrappers.
+
+.. code::
+
+    PROFILER.enable(trace_memory=True)
+    import ubc2.ubc_simon as m13
+    with stage("EBeam_heaters_JoaquinMatres_Simon_4", category="mask"):
+        m13.test_mask6()
+    PROFILER.write_json("profile.json")
+    PROFILER.write_chrome_trace("profile.trace.json")
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+# (module, attribute, category) of functions to instrument
+INSTRUMENTED = (
+    ("gdsfactory", "pack", "pack"),
+    ("gdsfactory", "grid", "pack"),
+    ("gdsfactory", "fill_rectangle", "fill"),
+    ("ubc2.fill", "fill_rectangle", "fill"),
+    ("gdsfactory", "add_tapers", "cell"),
+    ("gdsfactory.routing", "get_route", "routing"),
+    ("gdsfactory.routing", "get_bundle", "routing"),
+    ("gdsfactory.routing", "get_route_from_waypoints", "routing"),
+    ("gdsfactory.routing", "get_route_electrical", "routing"),
+    ("ubcpdk.components", "add_fiber_array", "routing"),
+    ("ubcpdk.components", "add_fiber_array_pads_rf", "routing"),
+)
+
+
+class CountingCache(dict):
+    """gdsfactory cell CACHE that counts lookups and hits per cell name."""
+
+    def __init__(self, *args, profiler: Profiler, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.profiler = profiler
+
+    def __contains__(self, name: object) -> bool:
+        hit = super().__contains__(name)
+        cell = self.profiler.cells.setdefault(
+            str(name), {"calls": 0, "hits": 0, "function": None}
+        )
+        cell["calls"] += 1
+        cell["hits"] += int(hit)
+        return hit
+
+    def __setitem__(self, name: str, component: Any) -> None:
+        super().__setitem__(name, component)
+        settings = getattr(component, "settings", None)
+        function_name = getattr(settings, "function_name", None)
+        if name in self.profiler.cells:
+            self.profiler.cells[name]["function"] = function_name
+
+
+class Profiler:
+    """Collects stages and cell cache statistics for one process."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.trace_memory = False
+        self.stages: list[dict[str, Any]] = []
+        self.cells: dict[str, dict[str, Any]] = {}
+        self._stack: list[dict[str, Any]] = []
+        self._originals: dict[tuple[str, str], Any] = {}
+
+    def reset(self) -> None:
+        self.stages = []
+        self.cells = {}
+        self._stack = []
+
+    def enable(self, trace_memory: bool = False) -> None:
+        """Starts recording and instruments gdsfactory/ubcpdk functions.
+
+        Args:
+            trace_memory: record allocation peaks with tracemalloc (slower).
+        """
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        for module_name, attribute, category in INSTRUMENTED:
+            module = importlib.import_module(module_name)
+            if (module_name, attribute) in self._originals or not hasattr(
+                module, attribute
+            ):
+                continue
+            function = getattr(module, attribute)
+            self._originals[(module_name, attribute)] = function
+            setattr(module, attribute, self.instrument(function, attribute, category))
+        self._install_cache()
+
+    def disable(self) -> None:
+        """Stops recording and restores the instrumented functions."""
+        for (module_name, attribute), function in self._originals.items():
+            setattr(sys.modules[module_name], attribute, function)
+        self._originals = {}
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _install_cache(self) -> None:
+        # gf.clear_cache() rebinds CACHE, so make sure ours is still in place
+        cell_module = sys.modules.get("gdsfactory.cell")
+        if cell_module and not isinstance(cell_module.CACHE, CountingCache):
+            cell_module.CACHE = CountingCache(cell_module.CACHE, profiler=self)
+
+    def instrument(self, function, name: str, category: str):
+        """Returns function wrapped in a stage."""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.stage(name, category=category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    @contextlib.contextmanager
+    def stage(self, name: str, category: str = "stage") -> Iterator[None]:
+        """Records wall time, CPU time and allocation peak of the enclosed block."""
+        if not self.enabled:
+            yield
+            return
+
+        self._install_cache()
+        # a routing call inside add_fiber_array must not be counted twice in totals
+        nested = any(
+            (
+                (f["category"], f["name"]) == (category, name)
+                if category == "stage"
+                else f["category"] == category
+            )
+            for f in self._stack
+        )
+        frame = dict(name=name, category=category, children_peak=0)
+        if self.trace_memory:
+            frame["memory_start"] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        start = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            self._stack.pop()
+
+            alloc_peak = None
+            if self.trace_memory:
+                # reset_peak in nested stages hides their peak from us, so take the
+                # max of our own peak and the peaks reported by children
+                peak = max(tracemalloc.get_traced_memory()[1], frame["children_peak"])
+                alloc_peak = peak - frame["memory_start"]
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent["children_peak"] = max(parent["children_peak"], peak)
+
+            self.stages.append(
+                dict(
+                    name=name,
+                    category=category,
+                    pid=os.getpid(),
+                    depth=len(self._stack),
+                    nested=nested,
+                    start=start,
+                    wall=wall,
+                    cpu=cpu,
+                    alloc_peak=alloc_peak,
+                )
+            )
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(stages=list(self.stages), cells=dict(self.cells))
+
+    def write_json(self, filepath: Path) -> Path:
+        return write_json([self.to_dict()], filepath)
+
+    def write_chrome_trace(self, filepath: Path) -> Path:
+        return write_chrome_trace([self.to_dict()], filepath)
+
+
+def merge(profiles: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Merges profiles from several processes.
+
+    Returns stages, cell statistics and totals per stage category and name.
+    """
+    stages: list[dict[str, Any]] = []
+    cells: dict[str, dict[str, Any]] = {}
+    for profile in profiles:
+        stages += profile["stages"]
+        for name, stats in profile["cells"].items():
+            cell = cells.setdefault(
+                name, {"calls": 0, "hits": 0, "function": stats["function"]}
+            )
+            cell["calls"] += stats["calls"]
+            cell["hits"] += stats["hits"]
+            cell["function"] = cell["function"] or stats["function"]
+
+    totals: dict[str, dict[str, float]] = {}
+    for stage in stages:
+        key = stage["name"] if stage["category"] == "stage" else stage["category"]
+        if stage["category"] == "mask" or stage["nested"]:
+            continue
+        total = totals.setdefault(key, {"count": 0, "wall": 0.0, "cpu": 0.0})
+        total["count"] += 1
+        total["wall"] += stage["wall"]
+        total["cpu"] += stage["cpu"]
+
+    # time spent in Python cell construction, outside any recorded stage
+    masks = [stage for stage in stages if stage["category"] == "mask"]
+    if masks:
+        children = [stage for stage in stages if stage["depth"] == 1]
+        totals["construction"] = {
+            "count": len(masks),
+            "wall": sum(s["wall"] for s in masks) - sum(s["wall"] for s in children),
+            "cpu": sum(s["cpu"] for s in masks) - sum(s["cpu"] for s in children),
+        }
+
+    functions: dict[str, dict[str, int]] = {}
+    for cell in cells.values():
+        function = functions.setdefault(
+            cell["function"] or "unknown", {"calls": 0, "hits": 0}
+        )
+        function["calls"] += cell["calls"]
+        function["hits"] += cell["hits"]
+
+    return dict(
+        stages=sorted(stages, key=lambda stage: stage["start"]),
+        totals=dict(sorted(totals.items(), key=lambda item: -item[1]["wall"])),
+        cells=cells,
+        functions=dict(sorted(functions.items(), key=lambda item: -item[1]["calls"])),
+    )
+
+
+def replace_text(filepath: Path, text: str) -> Path:
+    """Writes text by replacing filepath, never modifying the file in place.
+
+    Files of incremental builds are hardlinked to the published build.
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    filepath_tmp = filepath.with_suffix(".tmp")
+    filepath_tmp.write_text(text)
+    os.replace(filepath_tmp, filepath)
+    return filepath
+
+
+def write_json(profiles: Iterable[dict[str, Any]], filepath: Path) -> Path:
+    return replace_text(filepath, json.dumps(merge(profiles), indent=2))
+
+
+def write_chrome_trace(profiles: Iterable[dict[str, Any]], filepath: Path) -> Path:
+    """Writes profiles in Chrome trace event format, one track per process."""
+    stages = merge(profiles)["stages"]
+    t0 = min((stage["start"] for stage in stages), default=0)
+    events = [
+        dict(
+            name=stage["name"],
+            cat=stage["category"],
+            ph="X",
+            ts=(stage["start"] - t0) * 1e6,
+            dur=stage["wall"] * 1e6,
+            pid=stage["pid"],
+            tid=stage["pid"],
+            args=dict(cpu=stage["cpu"], alloc_peak=stage["alloc_peak"]),
+        )
+        for stage in stages
+    ]
+    return replace_text(
+        filepath, json.dumps(dict(traceEvents=events, displayTimeUnit="ms"))
+    )
+
+
+PROFILER = Profiler()
+stage = PROFILER.stage
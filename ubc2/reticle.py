@@ -0,0 +1,259 @@
+"""Assemble the masks of a build into one reticle GDS.
+
+Masks are read one at a time and their cells streamed into the output with
+gdstk.GdsWriter, so only one mask is in memory at any time. Cells are deduplicated
+by a hash of their geometry (polygons, paths, labels and references), not by
+name, so the PDK cells that every mask contains (gc_te1550, pad, ebeam_y_1550,
+bends ...) are written once. Each mask top cell is placed on a grid in the
+reticle top cell.
+
+.. code::
+
+    ubc2 reticle
+    python -m ubc2.reticle build/mask --columns 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import math
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+import gdstk
+import numpy as np
+
+from ubc2.config import MAX_POINTS, PATH
+
+SPACING = 100.0
+
+
+def read_library(filepath: Path) -> gdstk.Library:
+    filepath = Path(filepath)
+    if filepath.suffix == ".oas":
+        return gdstk.read_oas(filepath)
+    return gdstk.read_gds(filepath)
+
+
+def iter_cells(cells: Iterable[gdstk.Cell]) -> Iterator[gdstk.Cell]:
+    """Yields cells and all their dependencies once, children before parents."""
+    seen: set[int] = set()
+
+    def visit(cell: gdstk.Cell) -> Iterator[gdstk.Cell]:
+        seen.add(id(cell))
+        for child in cell.dependencies(False):
+            if id(child) not in seen:
+                yield from visit(child)
+        yield cell
+
+    for cell in cells:
+        if id(cell) not in seen:
+            yield from visit(cell)
+
+
+def _grid(values: Any, scaling: float) -> bytes:
+    """Returns values snapped to the database grid as bytes."""
+    return (
+        np.round(np.asarray(values, dtype=float) * scaling).astype(np.int64).tobytes()
+    )
+
+
+def _repetition(element: Any, scaling: float) -> bytes:
+    repetition = element.repetition
+    return _grid(repetition.get_offsets(), scaling) if repetition.size else b""
+
+
+def get_cell_hash(cell: gdstk.Cell, hashes: dict[int, str], scaling: float) -> str:
+    """Returns a hash of the cell geometry, independent of cell names.
+
+    Args:
+        cell: to hash.
+        hashes: hash of every cell the cell references, by id.
+        scaling: database units per user unit.
+    """
+    polygons = list(cell.polygons)
+    for path in cell.paths:
+        polygons += path.to_polygons()
+
+    records = [
+        b"P%d/%d" % (polygon.layer, polygon.datatype)
+        + _grid(polygon.points, scaling)
+        + _repetition(polygon, scaling)
+        for polygon in polygons
+    ]
+    records += [
+        f"L{label.text}|{label.layer}/{label.texttype}|{label.anchor}|"
+        f"{label.rotation:.9f}|{label.magnification:.9f}|{label.x_reflection}".encode()
+        + _grid(label.origin, scaling)
+        + _repetition(label, scaling)
+        for label in cell.labels
+    ]
+    records += [
+        f"R{hashes[id(reference.cell)]}|{reference.rotation:.9f}|"
+        f"{reference.magnification:.9f}|{reference.x_reflection}".encode()
+        + _grid(reference.origin, scaling)
+        + _repetition(reference, scaling)
+        for reference in cell.references
+    ]
+
+    digest = hashlib.sha256()
+    for record in sorted(records):
+        digest.update(len(record).to_bytes(8, "little"))
+        digest.update(record)
+    return digest.hexdigest()
+
+
+def get_positions(
+    bboxes: list[tuple[tuple[float, float], tuple[float, float]]],
+    columns: int | None = None,
+    spacing: float = SPACING,
+) -> list[tuple[float, float]]:
+    """Returns the origin that places each bbox on a grid, row by row."""
+    columns = columns or math.ceil(math.sqrt(len(bboxes)))
+    pitch_x = max(x1 - x0 for (x0, _), (x1, _) in bboxes) + spacing
+    pitch_y = max(y1 - y0 for (_, y0), (_, y1) in bboxes) + spacing
+    return [
+        ((index % columns) * pitch_x - x0, -(index // columns) * pitch_y - y0)
+        for index, ((x0, y0), _) in enumerate(bboxes)
+    ]
+
+
+def assemble_reticle(
+    filepaths: Iterable[Path],
+    filepath: Path,
+    name: str = "reticle",
+    columns: int | None = None,
+    spacing: float = SPACING,
+) -> dict[str, Any]:
+    """Writes all masks into one GDS with a top cell placing them on a grid.
+
+    Args:
+        filepaths: mask GDS or OASIS files.
+        filepath: output GDS.
+        name: top cell name.
+        columns: masks per row. Defaults to a square grid.
+        spacing: between masks in um.
+
+    Returns:
+        statistics of the assembly.
+    """
+    filepaths = list(filepaths)
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+
+    # geometry hash: written cell name
+    written: dict[str, str] = {}
+    written_names = {name}
+    tops: list[tuple[str, tuple[tuple[float, float], tuple[float, float]]]] = []
+    cells = 0
+
+    t0 = time.perf_counter()
+    writer = gdstk.GdsWriter(filepath, name=name, max_points=MAX_POINTS)
+    try:
+        for mask_filepath in filepaths:
+            library = read_library(mask_filepath)
+            scaling = library.unit / library.precision
+            top_level = library.top_level()
+            # string references below make bounding boxes unavailable
+            bboxes = [cell.bounding_box() for cell in top_level]
+            hashes: dict[int, str] = {}
+            names: dict[int, str] = {}
+
+            for cell in iter_cells(top_level):
+                cells += 1
+                digest = hashes[id(cell)] = get_cell_hash(cell, hashes, scaling)
+                if digest in written:
+                    names[id(cell)] = written[digest]
+                    continue
+
+                new_name = cell.name
+                if new_name in written_names:
+                    new_name = f"{cell.name}_{digest[:8]}"
+                for reference in cell.references:
+                    reference.cell = names[id(reference.cell)]
+                names[id(cell)] = cell.name = written[digest] = new_name
+                written_names.add(new_name)
+                writer.write(cell)
+
+            tops += [
+                (names[id(cell)], bbox)
+                for cell, bbox in zip(top_level, bboxes)
+                if bbox is not None
+            ]
+            del library
+
+        top = gdstk.Cell(name)
+        positions = get_positions([bbox for _, bbox in tops], columns, spacing)
+        for (top_name, _), origin in zip(tops, positions):
+            top.add(gdstk.Reference(top_name, origin=origin))
+        writer.write(top)
+    finally:
+        writer.close()
+
+    size_in = sum(Path(p).stat().st_size for p in filepaths)
+    return dict(
+        masks=len(tops),
+        cells_in=cells,
+        cells_out=len(written_names),
+        size_in=size_in,
+        size_out=filepath.stat().st_size,
+        duration=time.perf_counter() - t0,
+    )
+
+
+def get_mask_filepaths(dirpath: Path) -> list[Path]:
+    """Returns the GDS and OASIS files of a mask build directory."""
+    dirpath = Path(dirpath)
+    return sorted(
+        p for p in dirpath.iterdir() if p.suffix in {".gds", ".oas"} and p.is_file()
+    )
+
+
+def write_reticle(
+    dirpath: Path = PATH.mask,
+    filepath: Path | None = None,
+    columns: int | None = None,
+    spacing: float = SPACING,
+) -> Path | None:
+    """Assembles all masks in dirpath into a reticle GDS and prints statistics.
+
+    Args:
+        dirpath: mask build directory.
+        filepath: output GDS. Defaults to reticle.gds next to dirpath.
+        columns: masks per row. Defaults to a square grid.
+        spacing: between masks in um.
+
+    Returns:
+        filepath, None if dirpath has no masks.
+    """
+    dirpath = Path(dirpath)
+    filepaths = get_mask_filepaths(dirpath)
+    if not filepaths:
+        print(f"No masks in {dirpath}")
+        return None
+    filepath = Path(filepath or dirpath.parent / "reticle.gds")
+    stats = assemble_reticle(filepaths, filepath, columns=columns, spacing=spacing)
+    print(
+        f"{stats['masks']} masks, {stats['cells_in']} cells -> {stats['cells_out']}, "
+        f"{stats['size_in'] / 1e6:.2f} MB -> {stats['size_out'] / 1e6:.2f} MB "
+        f"in {stats['duration']:.2f}s: {filepath}"
+    )
+    return filepath
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dirpath", type=Path, nargs="?", default=PATH.mask)
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    parser.add_argument("--columns", type=int, default=None, help="masks per row")
+    parser.add_argument("--spacing", type=float, default=SPACING, help="um")
+    args = parser.parse_args(argv)
+    filepath = write_reticle(args.dirpath, args.output, args.columns, args.spacing)
+    return int(filepath is None)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+"""Check sweep points against design rules before building any geometry.
+
+A rule is a function of the sweep parameters that returns True where the rule
+passes. It receives every parameter as a NumPy array with one value per point,
+so a whole grid is checked with a few array operations, without instantiating a
+single component::
+
+    RING_RULES = {
+        "min_width": lambda width, **_: width >= MIN_WIDTH,
+        "min_gap": lambda gap, **_: gap >= MIN_SPACE,
+    }
+    points = screen(grid(width=widths, gap=gaps), RING_RULES)
+
+`screen` drops the failing points with a warning. For design spaces too large to
+hold as one dict per point, check `grid_columns` and only build the points that
+pass.
+"""
+
+from __future__ import annotations
+
+import warnings
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+import numpy as np
+
+# Si minimum feature size and space of the EBeam DRC decks
+MIN_WIDTH = 0.06
+MIN_SPACE = 0.06
+# smallest bend radius measured on these masks
+MIN_RADIUS = 2.0
+# S-bend shapes whose curvature is sampled at once
+BLOCK_SIZE = 4096
+
+Rules = dict[str, Callable[..., np.ndarray]]
+
+
+def get_columns(points: Sequence[dict[str, Any]]) -> dict[str, np.ndarray]:
+    """Returns one array per parameter with its value at every point."""
+    keys = points[0] if points else {}
+    return {key: np.array([point[key] for point in points]) for key in keys}
+
+
+def grid_columns(**values: Iterable[Any]) -> dict[str, np.ndarray]:
+    """Returns the columns of sweep.grid(**values), without building the points."""
+    arrays = [np.asarray(list(v)) for v in values.values()]
+    mesh = np.meshgrid(*arrays, indexing="ij")
+    return {key: m.ravel() for key, m in zip(values, mesh)}
+
+
+def check(columns: dict[str, np.ndarray], rules: Rules) -> dict[str, np.ndarray]:
+    """Returns, for every rule, a boolean array that is True where it fails."""
+    size = len(next(iter(columns.values()), []))
+    return {
+        name: ~np.broadcast_to(np.asarray(rule(**columns), dtype=bool), size)
+        for name, rule in rules.items()
+    }
+
+
+def screen(points: Iterable[dict[str, Any]], rules: Rules) -> list[dict[str, Any]]:
+    """Returns the points that pass all rules, warning about the others."""
+    points = list(points)
+    if not points or not rules:
+        return points
+    failures = check(get_columns(points), rules)
+    failed = np.logical_or.reduce(list(failures.values()))
+    if failed.any():
+        counts = ", ".join(
+            f"{name}: {mask.sum()}" for name, mask in failures.items() if mask.any()
+        )
+        first = points[int(np.argmax(failed))]
+        warnings.warn(
+            f"Dropped {failed.sum()} of {len(points)} sweep points that fail design "
+            f"rules ({counts}), for example {first}",
+            stacklevel=2,
+        )
+    return [point for point, f in zip(points, failed) if not f]
+
+
+def sbend_min_radius(dx: np.ndarray, dy: np.ndarray, npoints: int = 201) -> np.ndarray:
+    """Returns the minimum radius of gf.components.bend_s of each size.
+
+    bend_s is the cubic bezier through (0, 0), (dx/2, 0), (dx/2, dy), (dx, dy), so
+    its curvature has a closed form, evaluated at npoints along the curve. The
+    curve scales with dx, so only one radius per distinct dy / dx is computed.
+    """
+    dx, dy = np.broadcast_arrays(
+        np.asarray(dx, dtype=float), np.asarray(dy, dtype=float)
+    )
+    ratios, inverse = np.unique(np.abs(dy) / dx, return_inverse=True)
+    t = np.linspace(0, 1, npoints)
+    x1 = 1.5 * ((1 - t) ** 2 + t**2)
+    x2 = 3 * (2 * t - 1)
+    radii = np.empty_like(ratios)
+    # bounds memory to npoints values per ratio of a block
+    for i in range(0, len(ratios), BLOCK_SIZE):
+        r = ratios[i : i + BLOCK_SIZE, None]
+        y1 = 6 * r * t * (1 - t)
+        y2 = 6 * r * (1 - 2 * t)
+        curvature = np.abs(x1 * y2 - y1 * x2) / (x1**2 + y1**2) ** 1.5
+        with np.errstate(divide="ignore"):
+            radii[i : i + BLOCK_SIZE] = 1 / curvature.max(axis=1)
+    return dx * radii[inverse].reshape(dx.shape)
+
+
+def test_screen_grid() -> None:
+    import gdsfactory as gf
+
+    from ubc2.sweep import grid
+
+    rules = {
+        "min_width": lambda width, **_: width >= MIN_WIDTH,
+        "min_gap": lambda gap, **_: gap >= MIN_SPACE,
+    }
+    values = dict(width=np.linspace(0.05, 0.5, 100), gap=np.linspace(0.01, 1, 100))
+    points = grid(**values)
+    columns = grid_columns(**values)
+    np.testing.assert_array_equal(columns["gap"], get_columns(points)["gap"])
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        passed = screen(points, rules)
+    assert len(w) == 1
+    assert all(p["width"] >= MIN_WIDTH and p["gap"] >= MIN_SPACE for p in passed)
+    failures = check(columns, rules)
+    assert len(passed) == len(points) - np.logical_or(*failures.values()).sum()
+
+    size = (10.0, 2.125)
+    radius = gf.components.bend_s(size=size, npoints=999).info["min_bend_radius"]
+    assert np.isclose(sbend_min_radius(*size), radius, rtol=1e-2)
@@ -0,0 +1,197 @@
+"""Split a mask build across several machines that share a filesystem.
+
+Each machine builds one shard into its own directory next to the mask directory,
+then one machine merges the shards into the mask directory.
+
+.. code::
+
+    ubc2 build --shard 1/3     # on machine 1
+    ubc2 build --shard 2/3     # on machine 2
+    ubc2 build --shard 3/3     # on machine 3
+    ubc2 merge --shards 3      # once all shards finished
+
+Masks are assigned to shards by their build time recorded in the manifest of the
+mask directory, longest first onto the least loaded shard, so shards finish at
+about the same time. All shards must see the same manifest to agree on the split,
+so do not merge while shards are still starting.
+"""
+
+from __future__ import annotations
+
+import shutil
+import statistics
+from collections.abc import Iterable
+from pathlib import Path
+
+from ubc2.build import MaskFunction, get_mask_label, link, make_staging, publish
+from ubc2.manifest import Manifest, get_mask_fingerprint, is_layout
+
+# seconds, assumed build time when no build time was ever recorded
+DEFAULT_COST = 10.0
+# every mask writes these files next to its GDS or OASIS file
+SUFFIXES = (".yml", ".devices.jsonl", ".csv")
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    """Returns (index, count) from 'index/count', index starting at 1."""
+    try:
+        index, count = (int(value) for value in shard.split("/"))
+    except ValueError as error:
+        raise ValueError(f"shard {shard!r} must look like 1/3") from error
+    if not 1 <= index <= count:
+        raise ValueError(f"shard {shard!r} index must be between 1 and {count}")
+    return index, count
+
+
+def get_shard_dirpath(dirpath: Path, index: int, count: int) -> Path:
+    """Returns the directory where shard index of count is built."""
+    dirpath = Path(dirpath)
+    return dirpath.with_name(f"{dirpath.name}.shard-{index}-of-{count}")
+
+
+def get_costs(labels: Iterable[str], dirpath: Path) -> dict[str, float]:
+    """Returns estimated build time for each mask label.
+
+    Uses the build times recorded in the manifest of dirpath. Masks never built
+    before get the median of the recorded times.
+    """
+    labels = list(labels)
+    durations = Manifest(dirpath).get_durations()
+    known = [durations[label] for label in labels if label in durations]
+    default = statistics.median(known) if known else DEFAULT_COST
+    return {label: durations.get(label, default) for label in labels}
+
+
+def split(labels: list[str], costs: dict[str, float], count: int) -> list[list[int]]:
+    """Returns indices of labels for each shard, balancing the total cost.
+
+    Longest processing time first: each mask, most expensive first, goes to the
+    shard with the lowest total so far. Ties break on label and shard index, so
+    every machine computes the same split.
+    """
+    shards: list[list[int]] = [[] for _ in range(count)]
+    loads = [0.0] * count
+    order = sorted(range(len(labels)), key=lambda i: (-costs[labels[i]], labels[i]))
+    for index in order:
+        shard = min(range(count), key=lambda s: (loads[s], s))
+        shards[shard].append(index)
+        loads[shard] += costs[labels[index]]
+    return [sorted(indices) for indices in shards]
+
+
+def get_shard(
+    masks: list[MaskFunction], index: int, count: int, dirpath: Path
+) -> list[MaskFunction]:
+    """Returns the masks that shard index of count builds.
+
+    Args:
+        masks: all masks of the build, in the same order on every machine.
+        index: shard index, starting at 1.
+        count: number of shards.
+        dirpath: mask directory, whose manifest has the recorded build times.
+    """
+    labels = [get_mask_label(mask) for mask in masks]
+    costs = get_costs(labels, dirpath)
+    indices = split(labels, costs, count)[index - 1]
+    total = sum(costs[labels[i]] for i in indices)
+    print(f"shard {index}/{count}: {len(indices)} masks, estimated {total:.0f}s")
+    return [masks[i] for i in indices]
+
+
+def verify_shards(
+    masks: list[MaskFunction], dirpath: Path, count: int
+) -> tuple[dict[str, Manifest], list[str]]:
+    """Checks that the shards hold complete, current outputs for every mask.
+
+    A mask is consistent if exactly one shard has it built with the current
+    fingerprint, with its GDS, YAML and label CSV present and not empty, and no
+    other mask writes files with the same name.
+
+    Returns:
+        shard manifest for each mask label, and a list of errors.
+    """
+    errors = []
+    manifests = []
+    for index in range(1, count + 1):
+        shard_dirpath = get_shard_dirpath(dirpath, index, count)
+        if not (shard_dirpath / "manifest.json").exists():
+            errors.append(f"shard {index}/{count} missing in {shard_dirpath}")
+            continue
+        manifests.append(Manifest(shard_dirpath))
+
+    sources: dict[str, Manifest] = {}
+    owners: dict[str, str] = {}
+    for mask in masks:
+        label = get_mask_label(mask)
+        fingerprint = get_mask_fingerprint(mask)
+        found = [
+            manifest
+            for manifest in manifests
+            if manifest.entries.get(label, {}).get("fingerprint") == fingerprint
+        ]
+        if not found:
+            errors.append(f"{label} not built with current sources in any shard")
+            continue
+        if len(found) > 1:
+            shards = [manifest.dirpath.name for manifest in found]
+            errors.append(f"{label} built in several shards {shards}")
+            continue
+
+        manifest = found[0]
+        gdspath = manifest.get_gdspath(label)
+        for filepath in [gdspath] + [gdspath.with_suffix(s) for s in SUFFIXES]:
+            if not filepath.exists() or filepath.stat().st_size == 0:
+                errors.append(f"{label} missing or empty {filepath}")
+        for name in manifest.entries[label]["files"]:
+            if name in owners:
+                errors.append(f"{label} and {owners[name]} both write {name}")
+            owners[name] = label
+        sources[label] = manifest
+    return sources, errors
+
+
+def merge_shards(masks: list[MaskFunction], dirpath: Path, count: int) -> list[str]:
+    """Verifies the shards and publishes all their outputs into dirpath.
+
+    The merged directory links to the shard files, it does not copy them, and
+    replaces dirpath in one rename like a regular build. Nothing is published if
+    any shard is missing or inconsistent.
+
+    Returns:
+        errors found while verifying, empty if the merge succeeded.
+    """
+    masks = list(masks)
+    dirpath = Path(dirpath)
+    sources, errors = verify_shards(masks, dirpath, count)
+    if errors:
+        for error in errors:
+            print(f"FAILED {error}")
+        return errors
+
+    staging = make_staging(dirpath)
+    try:
+        manifest = Manifest(staging)
+        (staging / "gds").mkdir()
+        for label, source in sources.items():
+            entry = source.entries[label]
+            for name in entry["files"]:
+                link(source.dirpath / name, staging / name)
+                if is_layout(name):
+                    link(staging / name, staging / "gds" / name)
+            manifest.entries[label] = entry
+        manifest.write()
+        publish(staging, dirpath)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    print(f"merged {len(sources)} masks from {count} shards into {dirpath}")
+    return []
+
+
+def test_split_balances_costs() -> None:
+    labels = [f"mask{i:02d}" for i in range(11)]
+    costs = dict(zip(labels, [10] + [1] * 10))
+    shards = split(labels, costs, 2)
+    # round-robin would put 15s on one shard and 5s on the other
+    assert [sum(costs[labels[i]] for i in shard) for shard in shards] == [10, 10]
+    assert split(labels, costs, 2) == shards
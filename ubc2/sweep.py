@@ -0,0 +1,201 @@
+"""Build the variants of a parameter sweep, in parallel for large sweeps.
+
+A sweep is a cell, the points of a parameter grid, a naming template formatted
+with each point (and the info of its cell) and a wrapper, such as
+add_fiber_array, that receives the name as component_name::
+
+    e = sweep(ring, grid(width=(0.4, 0.5), gap=(0.2, 0.3)), "ring_{width}_{gap}", add_gc)
+    write_mask_dies(e, "EBeam_simbilod_30")
+
+Small sweeps are built in this process. Large sweeps are split into chunks that
+worker processes build and write into one GDS each. Chunks are read back as they
+finish and their cells deduplicated by geometry hash, so the PDK cells that every
+variant contains (gc_te1550, tapers, bends ...) are loaded once. Variants keep their
+ports, info and settings, so packing and the metadata sidecar work unchanged.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import multiprocessing
+import os
+import tempfile
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import gdstk
+
+from ubc2.cell_cache import SHARED_CELLS, dump_metadata, get_cell
+from ubc2.dry_run import record_footprints
+from ubc2.reticle import MAX_POINTS, iter_cells
+from ubc2.rules import Rules, screen
+
+# points built by one worker task
+CHUNK_SIZE = 100
+# a spawned worker takes about 2.5 s to start and import gdsfactory, and a routed
+# variant about 15 ms to build and 1 ms to read back, so smaller sweeps are built
+# in this process unless max_workers is given
+PARALLEL_SIZE = 1000
+
+Point = dict[str, Any]
+
+
+def grid(**values: Iterable[Any]) -> list[Point]:
+    """Returns every combination of values, the last parameter varying fastest."""
+    return [dict(zip(values, point)) for point in itertools.product(*values.values())]
+
+
+def zip_grid(**values: Iterable[Any]) -> list[Point]:
+    """Returns one point per position of the values, like zip."""
+    return [dict(zip(values, point)) for point in zip(*values.values(), strict=True)]
+
+
+def build_variant(
+    cell: Callable[..., Any],
+    point: Point,
+    name: str,
+    wrapper: Callable[..., Any],
+    kwargs: dict[str, Any],
+):
+    """Returns wrapper(cell(**point)) named by the template."""
+    component = cell(**point)
+    component_name = name.format(**{**component.info, **point})
+    return wrapper(component, component_name=component_name, **kwargs)
+
+
+def build_serial(
+    cell: Callable[..., Any],
+    points: list[Point],
+    name: str,
+    wrapper: Callable[..., Any],
+    kwargs: dict[str, Any],
+) -> list:
+    return [build_variant(cell, point, name, wrapper, kwargs) for point in points]
+
+
+def build_chunk(
+    cell: Callable[..., Any],
+    points: list[Point],
+    name: str,
+    wrapper: Callable[..., Any],
+    kwargs: dict[str, Any],
+    gdspath: Path,
+) -> tuple[Path, list[dict[str, Any]]]:
+    """Builds points in a worker and writes them into one GDS.
+
+    Returns:
+        gdspath and the metadata of every variant, in the order of points.
+    """
+    with record_footprints():
+        components = build_serial(cell, points, name, wrapper, kwargs)
+    library = gdstk.Library()
+    library.add(*iter_cells(get_cell(c) for c in components))
+    library.write_gds(gdspath, max_points=MAX_POINTS)
+    return gdspath, [dump_metadata(c) for c in components]
+
+
+def build_parallel(
+    cell: Callable[..., Any],
+    points: list[Point],
+    name: str,
+    wrapper: Callable[..., Any],
+    kwargs: dict[str, Any],
+    max_workers: int,
+    chunk_size: int = CHUNK_SIZE,
+) -> list:
+    """Builds chunks of points on a process pool and reads them back in order."""
+    chunks = [points[i : i + chunk_size] for i in range(0, len(points), chunk_size)]
+    variants = []
+    with tempfile.TemporaryDirectory(prefix="ubc2_sweep_") as dirpath:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = [
+                pool.submit(
+                    build_chunk,
+                    cell,
+                    chunk,
+                    name,
+                    wrapper,
+                    kwargs,
+                    Path(dirpath) / f"{index}.gds",
+                )
+                for index, chunk in enumerate(chunks)
+            ]
+            for future in futures:
+                variants += SHARED_CELLS.read(*future.result())
+    return variants
+
+
+def sweep(
+    cell: Callable[..., Any],
+    points: Iterable[Point],
+    name: str,
+    wrapper: Callable[..., Any],
+    max_workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    rules: Rules | None = None,
+    **kwargs,
+) -> list:
+    """Returns one wrapped variant of cell per point.
+
+    Args:
+        cell: function building the device from the parameters of a point.
+        points: parameters of each variant, see grid and zip_grid.
+        name: template formatted with the point and the info of the device,
+            e.g. "ring_width_{width:1.3f}_gap_{gap:1.3f}".
+        wrapper: routes each device, called with component_name and kwargs,
+            e.g. add_fiber_array.
+        max_workers: number of processes. Defaults to one per chunk of points,
+            up to the number of CPUs, for sweeps of PARALLEL_SIZE points or more.
+            Smaller sweeps, or max_workers=1, are built in this process.
+        chunk_size: points per worker task.
+        rules: design rules checked on all points before building anything.
+            Points that fail are dropped with a warning, see ubc2.rules.
+        kwargs: for the wrapper.
+    """
+    points = screen(points, rules) if rules else list(points)
+    if max_workers is None and len(points) < PARALLEL_SIZE:
+        max_workers = 1
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, math.ceil(len(points) / chunk_size))
+    if max_workers <= 1:
+        return build_serial(cell, points, name, wrapper, kwargs)
+    return build_parallel(
+        cell, points, name, wrapper, kwargs, max_workers, chunk_size=chunk_size
+    )
+
+
+def test_sweep_parallel_matches_serial() -> None:
+    import gdsfactory as gf
+    import ubcpdk.components as pdk
+
+    from ubc2.packing import pack
+
+    points = grid(length=(10, 20, 30), width=(0.4, 0.5))
+    name = "straight_length_{length}_width_{width}"
+    cell = gf.components.straight
+    serial = sweep(cell, points, name, pdk.add_fiber_array)
+    parallel = sweep(
+        cell, points, name, pdk.add_fiber_array, max_workers=2, chunk_size=2
+    )
+
+    assert [c.name for c in parallel] == [c.name for c in serial]
+    for s, p in zip(serial, parallel):
+        assert list(p.ports) == list(s.ports)
+        assert p.settings.function_name == s.settings.function_name
+        assert p.info == s.info
+        assert p.hash_geometry() == s.hash_geometry()
+
+    # the grating coupler is loaded once, not once per chunk
+    gcs = {
+        id(child)
+        for c in parallel
+        for child in c.get_dependencies(recursive=True)
+        if child.name.startswith("gc_te1550")
+    }
+    assert len(gcs) == 1
+    assert len(pack(parallel, max_size=(2000, 2000))) == 1
@@ -1,63 +1,61 @@
 """Write all mask for the course."""
-import shutil
 
-from ubcpdk.config import PATH
+import argparse
+from collections.abc import Callable
+from pathlib import Path
 
-import ubc2.ubc_helge as m12
-import ubc2.ubc_joaquin_matres1 as m11
-import ubc2.ubc_joaquin_matres_heaters as heaters
-import ubc2.ubc_simon as m13
-import ubc2.ubc_simon_bends as bends
-import ubc2.ubc_simon_dcs as dcs
-import ubc2.ubc_simon_loss as loss
-import ubc2.ubc_simon_rings as rings
+from ubc2.build import MaskResult, build_masks
+from ubc2.config import PATH
+from ubc2.masks import MASKS, get_mask
+from ubc2.shard import get_shard, get_shard_dirpath, merge_shards, parse_shard
+
+
+def get_masks_2023_v1() -> list[Callable[[], Path]]:
+    """Returns the function of every registered mask, importing their modules."""
+    return [get_mask(name) for name in MASKS]
+
+
+def write_masks_2023_v1(
+    incremental: bool = False, shard: str | None = None
+) -> list[MaskResult]:
+    """Write all masks for 2023_v1.
+
+    Args:
+        incremental: only rebuild masks whose inputs changed since the last build.
+        shard: only build shard 'index/count', merge later with merge_masks_2023_v1.
+    """
+    masks = get_masks_2023_v1()
+    dirpath = PATH.mask
+    if shard:
+        index, count = parse_shard(shard)
+        masks = get_shard(masks, index, count, dirpath)
+        dirpath = get_shard_dirpath(dirpath, index, count)
+    return build_masks(masks, dirpath=dirpath, incremental=incremental)
+
+
+def merge_masks_2023_v1(count: int) -> list[str]:
+    """Verify and merge the outputs of count shards, returning errors."""
+    return merge_shards(get_masks_2023_v1(), dirpath=PATH.mask, count=count)
 
 
 def test_masks_2023_v1():
     """Write all masks for 2023_v1."""
-    dirpath = PATH.mask
-    dirpath_gds = dirpath / "gds"
-
-    if dirpath.exists():
-        shutil.rmtree(dirpath)
-    dirpath_gds.mkdir(exist_ok=True, parents=True)
-
-    for mask in [
-        m11.test_mask1,
-        m11.test_mask2,
-        m11.test_mask3,
-        m11.test_mask4,
-        m11.test_mask5,
-        m11.test_mask6,
-        m11.test_mask7,
-        m12.test_mask1,
-        m12.test_mask2,
-        m13.test_mask1,
-        m13.test_mask3,
-        m13.test_mask4,
-        m13.test_mask5,
-        bends.test_mask_bends_circular,
-        bends.test_mask_bends_euler,
-        loss.test_mask_continuum1,
-        loss.test_mask_continuum2,
-        loss.test_mask_continuum3,
-        rings.test_mask_rings_1,
-        rings.test_mask_rings_2,
-        rings.test_mask_rings_3,
-        dcs.test_mask_dcs_1,
-        dcs.test_mask_dcs_2,
-        dcs.test_mask_dcs_3,
-        dcs.test_mask_dcs_4,
-        dcs.test_mask_dcs_5,
-        dcs.test_mask_dcs_6,
-        heaters.test_mzi_heater,
-        heaters.test_ring_heater,
-    ]:
-        mask()
-
-    for gdspath in dirpath.glob("*.gds"):
-        shutil.copyfile(gdspath, dirpath_gds / f"{gdspath.name}")
+    results = write_masks_2023_v1()
+    failed = [result.mask for result in results if not result.ok]
+    assert not failed, f"{len(failed)} masks failed: {failed}"
 
 
 if __name__ == "__main__":
-    test_masks_2023_v1()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--incremental", action="store_true", help="only rebuild changed masks"
+    )
+    parser.add_argument("--shard", default=None, help="only build shard I/N")
+    parser.add_argument(
+        "--merge", type=int, default=None, metavar="N", help="merge N built shards"
+    )
+    args = parser.parse_args()
+    if args.merge:
+        merge_masks_2023_v1(args.merge)
+    else:
+        write_masks_2023_v1(incremental=args.incremental, shard=args.shard)
@@ -3,56 +3,58 @@ from pathlib import Path
 import gdsfactory as gf
 import ubcpdk
 import ubcpdk.components as pdk
-from ubcpdk.tech import LAYER
 
-from ubc2.write_mask import pack, size, write_mask_gds_with_metadata
+from ubc2.write_mask import write_mask_dies
 
 add_gc = ubcpdk.components.add_fiber_array
 nm = 1e-3
 
 
-def test_mask1() -> Path:
-    """DBR filters."""
+@gf.cell
+def dbr_filter(n: int) -> gf.Component:
+    """Two splitters joined by two Bragg gratings of n periods.
+
+    gf.components.dbr places one grating period as an array of n columns, so the
+    filter size does not grow with n.
+    """
+    c = gf.Component()
+    splitter = pdk.ebeam_bdc_te1550()
 
-    @gf.cell
-    def dbr_filter(n) -> gf.Component:
-        c = gf.Component()
-        splitter = pdk.ebeam_bdc_te1550()
+    splitter_1 = c << splitter
+    splitter_2 = c << splitter
 
-        splitter_1 = c << splitter
-        splitter_2 = c << splitter
+    dbr = pdk.dbg(n=n) if n > 0 else pdk.straight(0)
+    dbr_1 = c << dbr
+    dbr_2 = c << dbr
 
-        dbr = pdk.dbg(n=n) if n > 0 else pdk.straight(0)
-        dbr_1 = c << dbr
-        dbr_2 = c << dbr
+    dbr_1.connect("o1", splitter_1["o3"])
+    dbr_2.connect("o1", splitter_1["o4"])
+    splitter_2.connect("o4", dbr_1["o2"])
 
-        dbr_1.connect("o1", splitter_1["o3"])
-        dbr_2.connect("o1", splitter_1["o4"])
-        splitter_2.connect("o4", dbr_1["o2"])
+    bend_1 = c << pdk.bend(angle=90)
+    bend_1.connect("o1", splitter_1["o1"])
+    bend_2 = c << pdk.bend(angle=90)
+    bend_2.connect("o2", splitter_2["o1"])
 
-        bend_1 = c << pdk.bend(angle=90)
-        bend_1.connect("o1", splitter_1["o1"])
-        bend_2 = c << pdk.bend(angle=90)
-        bend_2.connect("o2", splitter_2["o1"])
+    term = c << pdk.terminator_short(length=5, width1=0.5, width2=60 * nm)
+    term.connect("o1", splitter_2["o2"])
 
-        term = c << pdk.terminator_short(length=5, width1=0.5, width2=60 * nm)
-        term.connect("o1", splitter_2["o2"])
+    c.add_port("out1", port=bend_2["o1"])
+    c.add_port("out2", port=bend_1["o2"])
+    c.add_port("in1", port=splitter_1["o2"])
+    # c.add_port("in2", port=splitter_1["o1"])
+    c.info["periods"] = n
 
-        c.add_port("out1", port=bend_2["o1"])
-        c.add_port("out2", port=bend_1["o2"])
-        c.add_port("in1", port=splitter_1["o2"])
-        # c.add_port("in2", port=splitter_1["o1"])
+    return c
 
-        return c
+
+def test_mask1() -> Path:
+    """DBR filters."""
 
     rings = [dbr_filter(length) for length in [0, 250, 500, 750, 1000, 1250]]
     rings_gc = [pdk.add_fiber_array(ring, fanout_length=15) for ring in rings]
 
-    c = pack(rings_gc)
-    m = c[0]
-    m.name = "EBeam_JoaquinMatres_Helge_1"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(rings_gc, "EBeam_JoaquinMatres_Helge_1")
 
 
 def test_mask2() -> Path:
@@ -73,11 +75,24 @@ def test_mask2() -> Path:
         for coupling_length in [0, 2]
     ]
 
-    c = pack(e)
-    m = c[0]
-    m.name = "EBeam_JoaquinMatres_Helge_2"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(e, "EBeam_JoaquinMatres_Helge_2")
+
+
+def test_dbr_filter_size_does_not_grow(tmp_path: Path) -> None:
+    import gdstk
+
+    sizes = []
+    for n in (10, 10000):
+        c = dbr_filter(n)
+        assert c.info["periods"] == n
+        gdspath = c.write_gds(tmp_path / f"{n}.gds", logging=False)
+        library = gdstk.read_gds(gdspath)
+        columns = {
+            r.repetition.columns for cell in library.cells for r in cell.references
+        }
+        assert n in columns
+        sizes.append(sum(len(cell.polygons) for cell in library.cells))
+    assert sizes[0] == sizes[1]
 
 
 if __name__ == "__main__":
@@ -6,15 +6,9 @@ import gdsfactory as gf
 import ubcpdk
 import ubcpdk.components as pdk
 from ubcpdk import tech
-from ubcpdk.tech import LAYER
 
 from ubc2.cutback_2x2 import cutback_2x2
-from ubc2.write_mask import (
-    add_gc,
-    pack,
-    size,
-    write_mask_gds_with_metadata,
-)
+from ubc2.write_mask import add_gc, write_mask_dies
 
 length_x = 0.1
 
@@ -40,13 +34,7 @@ def test_mask1() -> Path:
         )
     ]
 
-    c = pack(e)
-    m = c[0]
-    if len(c) > 1:
-        raise ValueError(f"Failed to pack. It requires {len(c)}")
-    m.name = "EBeam_JoaquinMatres_11"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(e, "EBeam_JoaquinMatres_11", max_dies=1)
 
 
 def test_mask2() -> Path:
@@ -79,12 +67,7 @@ def test_mask2() -> Path:
         )
     )
 
-    c = pack(e)
-
-    m = c[0]
-    m.name = "EBeam_JoaquinMatres_12"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(e, "EBeam_JoaquinMatres_12")
 
 
 def test_mask3() -> Path:
@@ -99,11 +82,7 @@ def test_mask3() -> Path:
         add_gc(ubcpdk.components.straight(), component_name=f"straight_{i}")
         for i in range(2)
     ]
-    c = pack(e)
-    m = c[0]
-    m.name = "EBeam_JoaquinMatres_13"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(e, "EBeam_JoaquinMatres_13")
 
 
 def test_mask4() -> Path:
@@ -128,11 +107,7 @@ def test_mask4() -> Path:
         for gap in gaps
     ]
 
-    c = pack(rings)
-    m = c[0]
-    m.name = "EBeam_JoaquinMatres_14"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(rings, "EBeam_JoaquinMatres_14")
 
 
 def test_mask5() -> Path:
@@ -143,11 +118,7 @@ def test_mask5() -> Path:
         for dw in [5, 10, 20, 40, 60, 80, 100, 150, 200]
     ]
 
-    c = pack(e)
-    m = c[0]
-    m.name = "EBeam_JoaquinMatres_15"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(e, "EBeam_JoaquinMatres_15")
 
 
 def test_mask6() -> Path:
@@ -168,11 +139,7 @@ def test_mask6() -> Path:
     ]
     mmis_gc = [pdk.add_fiber_array(mmi, optical_routing_type=1) for mmi in mmis]
 
-    c = pack(mmis_gc)
-    m = c[0]
-    m.name = "EBeam_JoaquinMatres_16"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(mmis_gc, "EBeam_JoaquinMatres_16")
 
 
 def test_mask7() -> Path:
@@ -197,14 +164,7 @@ def test_mask7() -> Path:
     mmis_gc = [
         pdk.add_fiber_array(component=mmi, optical_routing_type=1) for mmi in mmis
     ]
-    c = pack(mmis_gc)
-
-    m = c[0]
-    if len(c) > 1:
-        raise ValueError(f"Failed to pack. It requires {len(c)}")
-    m.name = "EBeam_JoaquinMatres_17"
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(mmis_gc, "EBeam_JoaquinMatres_17", max_dies=1)
 
 
 if __name__ == "__main__":
@@ -6,14 +6,8 @@ from pathlib import Path
 import gdsfactory as gf
 import ubcpdk
 import ubcpdk.components as pdk
-from ubcpdk.tech import LAYER
 
-from ubc2.write_mask import (
-    add_gc,
-    pack_actives,
-    size_actives,
-    write_mask_gds_with_metadata,
-)
+from ubc2.write_mask import add_gc, size_actives, write_mask_dies
 
 
 def test_mzi_heater() -> Path:
@@ -28,11 +22,11 @@ def test_mzi_heater() -> Path:
         for mzi in mzis
     ]
 
-    c = pack_actives(mzis_gc + mzis_heater_gc)
-    m = c[0]
-    m.name = "EBeam_heaters_JoaquinMatres_14"
-    _ = m << gf.components.rectangle(size=size_actives, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(
+        mzis_gc + mzis_heater_gc,
+        "EBeam_heaters_JoaquinMatres_14",
+        max_size=size_actives,
+    )
 
 
 def test_ring_heater() -> Path:
@@ -53,11 +47,9 @@ def test_ring_heater() -> Path:
         for length_x in lengths_x
     ]
 
-    c = pack_actives(rings_gc)
-    m = c[0]
-    m.name = "EBeam_heaters_JoaquinMatres_15"
-    _ = m << gf.components.rectangle(size=size_actives, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    return write_mask_dies(
+        rings_gc, "EBeam_heaters_JoaquinMatres_15", max_size=size_actives
+    )
 
 
 if __name__ == "__main__":
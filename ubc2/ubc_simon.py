@@ -4,6 +4,7 @@ from functools import partial
 from pathlib import Path
 
 import gdsfactory as gf
+import numpy as np
 import ubcpdk
 import ubcpdk.components as pdk
 from gdsfactory.components.bend_euler import bend_euler
@@ -13,6 +14,8 @@ from gdsfactory.components.via_stack import via_stack_heater_m3
 from gdsfactory.typings import ComponentSpec, CrossSectionSpec, Float2
 from ubcpdk.tech import LAYER
 
+from ubc2.cell_cache import disk_cache
+from ubc2.fill import fill_rectangle
 from ubc2.write_mask import size_actives, write_mask_gds_with_metadata
 
 via_stack_heater_m3_mini = partial(via_stack_heater_m3, size=(4, 4))
@@ -24,6 +27,7 @@ layer_label = LAYER.TEXT
 GC_PITCH = 127
 
 
+@disk_cache
 @gf.cell
 def ring_single_heater(
     gap: float = 0.2,
@@ -130,6 +134,60 @@ def ring_single_heater(
     return c
 
 
+def add_resonator_row(
+    c: gf.Component,
+    resonator: gf.Component,
+    resonator_heater: gf.Component,
+    num_rings: int,
+    pitch: float,
+    electrical_ports: tuple[str, str] = ("e1", "e2"),
+) -> None:
+    """Places resonators rotated by 90 degrees, resonator i at x = -i * pitch.
+
+    The resonators 0 and num_rings // 2 are heated single references. Each run of
+    passive resonators between them is one array reference, so the number of
+    references does not grow with num_rings. Ports are added per resonator as
+    o1_{i}, o2_{i} and, for heated ones, e1_{i}, e2_{i} from electrical_ports.
+
+    Args:
+        c: component to add the resonators to.
+        resonator: passive resonator.
+        resonator_heater: heated resonator.
+        num_rings: number of resonators.
+        pitch: distance between resonators.
+        electrical_ports: heater ports exposed as e1_{i} and e2_{i}.
+    """
+    heated = {0, num_rings // 2}
+    refs = {}
+    for index in sorted(heated):
+        ref = refs[index] = c << resonator_heater
+        ref.rotate(90).movex(-index * pitch)
+
+    bounds = [*sorted(heated), num_rings]
+    for start, stop in zip(bounds, bounds[1:]):
+        run = range(start + 1, stop)
+        if not run:
+            continue
+        ref = c.add_array(resonator, columns=len(run), rows=1, spacing=(pitch, 0))
+        # the array origin is the last resonator of the run, the leftmost one
+        ref.rotate(90).movex(-run[-1] * pitch)
+        for index in run:
+            refs[index] = (ref, (run[-1] - index) * pitch)
+
+    for index in range(num_rings):
+        if index in heated:
+            ref = refs[index]
+            c.add_port(f"e1_{index}", port=ref.ports[electrical_ports[0]])
+            c.add_port(f"e2_{index}", port=ref.ports[electrical_ports[1]])
+            ports = ref.ports
+        else:
+            ref, dx = refs[index]
+            ports = {name: ref.ports[name].move_copy(dx, 0) for name in ("o1", "o2")}
+        c.add_port(f"o1_{index}", port=ports["o1"])
+        c.add_port(f"o2_{index}", port=ports["o2"])
+
+
+@disk_cache
 @gf.cell
 def rings_proximity(
     num_rings: int = 5,
@@ -147,27 +205,19 @@ def rings_proximity(
     c = gf.Component()
     gap = 0.2  # TODO: make variable
     width = 0.5  # TODO: make variable
-    for index in range(num_rings):
-        if index in [0, num_rings // 2]:
-            ring = c << ring_single_heater(
-                length_x=2, via_stack=pdk.via_stack_heater_mtop
-            )
-            ring.rotate(90).movex(
-                -index * (sep_resonators + 2 * radius + 3 * width - gap)
-            )
-            c.add_port(f"e1_{index}", port=ring.ports["e1"])
-            c.add_port(f"e2_{index}", port=ring.ports["e2"])
-        else:
-            ring = c << gf.components.ring_single(length_x=2)
-            ring.rotate(90).movex(
-                -index * (sep_resonators + 2 * radius + 3 * width - gap)
-            )
-        c.add_port(f"o1_{index}", port=ring.ports["o1"])
-        c.add_port(f"o2_{index}", port=ring.ports["o2"])
-
+    add_resonator_row(
+        c,
+        resonator=gf.components.ring_single(length_x=2),
+        resonator_heater=ring_single_heater(
+            length_x=2, via_stack=pdk.via_stack_heater_mtop
+        ),
+        num_rings=num_rings,
+        pitch=sep_resonators + 2 * radius + 3 * width - gap,
+    )
     return c
 
 
+@disk_cache
 @gf.cell
 def disks_proximity(
     num_rings=5,
@@ -177,32 +227,26 @@ def disks_proximity(
     c = gf.Component()
     gap = 0.2
     width = 0.5
-    for index in range(num_rings):
-        if index in [0, num_rings // 2]:
-            disk = c << gf.components.disk_heater(
-                wrap_angle_deg=10.0,
-                radius=radius,
-                port_orientation=270,
-                via_stack=pdk.via_stack_heater_mtop,
-                heater_layer=LAYER.M1_HEATER,
-            ).rotate(90).movex(-index * (sep_resonators + 2 * radius + 2 * width + gap))
-            c.add_port(f"e1_{index}", port=disk.ports["e2"])
-            c.add_port(f"e2_{index}", port=disk.ports["e1"])
-        else:
-            disk = c << gf.components.disk(
-                wrap_angle_deg=10.0,
-                radius=radius,
-            ).rotate(
-                90
-            ).movex(-index * (sep_resonators + 2 * radius + 2 * width + gap))
-        c.add_port(f"o1_{index}", port=disk.ports["o1"])
-        c.add_port(f"o2_{index}", port=disk.ports["o2"])
+    add_resonator_row(
+        c,
+        resonator=gf.components.disk(wrap_angle_deg=10.0, radius=radius),
+        resonator_heater=gf.components.disk_heater(
+            wrap_angle_deg=10.0,
+            radius=radius,
+            port_orientation=270,
+            via_stack=pdk.via_stack_heater_mtop,
+            heater_layer=LAYER.M1_HEATER,
+        ),
+        num_rings=num_rings,
+        pitch=sep_resonators + 2 * radius + 2 * width + gap,
+        electrical_ports=("e2", "e1"),
+    )
     return c
 
 
 def bend_gc_array(
-    gc_spec: ComponentSpec = pdk.gc_te1550(),
-    bend_spec: ComponentSpec = gf.components.bend_euler(),
+    gc_spec: ComponentSpec = pdk.gc_te1550,
+    bend_spec: ComponentSpec = gf.components.bend_euler,
 ) -> gf.Component:
     """Two gc's with opposite bends.
 
@@ -428,7 +472,7 @@ def crosstalk_experiment_parametrized_mask(
     rings.movex(g.xmin + 225).movey((pads.ymin + pads.ymax) / 2 + ring_y_offset)
     if fill_layers:
         for layer in fill_layers:
-            _ = m << gf.fill_rectangle(
+            _ = m << fill_rectangle(
                 rings,
                 fill_size=fill_size,
                 fill_layers=[layer],
@@ -595,6 +639,39 @@ def test_mask6() -> Path:
     return write_mask_gds_with_metadata(m)
 
 
+def test_rings_proximity_arrays() -> None:
+    import gdstk
+
+    c = rings_proximity(num_rings=100, sep_resonators=5.0)
+    # two heated rings and one array for each run of passive rings
+    assert len(c.references) == 4
+    pitch = 5.0 + 2 * 10.0 + 3 * 0.5 - 0.2
+    xs = [c.ports[f"o1_{i}"].x for i in range(100)]
+    assert np.allclose(np.diff(xs), -pitch)
+    assert {"e1_0", "e2_0", "e1_50", "e2_50"} <= set(c.ports)
+
+    # same geometry and ports as one reference per ring, as placed before arrays
+    c = rings_proximity(num_rings=7, sep_resonators=5.0)
+    expected = gf.Component()
+    for index in range(7):
+        if index in [0, 7 // 2]:
+            ring = expected << ring_single_heater(
+                length_x=2, via_stack=pdk.via_stack_heater_mtop
+            )
+        else:
+            ring = expected << gf.components.ring_single(length_x=2)
+        ring.rotate(90).movex(-index * pitch)
+        for name in ("o1", "o2"):
+            np.testing.assert_allclose(
+                c.ports[f"{name}_{index}"].center, ring.ports[name].center, atol=1e-9
+            )
+    polygons = c.get_polygons(by_spec=True)
+    expected_polygons = expected.get_polygons(by_spec=True)
+    assert set(polygons) == set(expected_polygons)
+    for layer, points in polygons.items():
+        assert not gdstk.boolean(points, expected_polygons[layer], "xor"), layer
+
+
 if __name__ == "__main__":
     m = test_mask1()
     # m = test_mask3()
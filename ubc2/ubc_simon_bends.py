@@ -1,20 +1,17 @@
 """Sample mask for the edx course Q1 2023."""
 
-from functools import partial
 from pathlib import Path
 
 import gdsfactory as gf
 import ubcpdk
 from gdsfactory.components.bend_circular import bend_circular
 from gdsfactory.components.bend_euler import bend_euler
-from gdsfactory.components.via_stack import via_stack_heater_m3
 from gdsfactory.typings import Tuple
 from ubcpdk.tech import LAYER
 
+from ubc2.sweep import sweep, zip_grid
 from ubc2.write_mask import size, write_mask_gds_with_metadata
 
-via_stack_heater_m3_mini = partial(via_stack_heater_m3, size=(4, 4))
-
 add_gc = ubcpdk.components.add_fiber_array
 layer_label = LAYER.TEXT
 GC_PITCH = 127
@@ -25,6 +22,28 @@ cols = (10, 7, 5)
 rows = (3, 5, 8)
 
 
+def cutback_circular(radius: float, cols: int, rows: int) -> gf.Component:
+    """Cutback of circular bends."""
+    return gf.components.cutback_bend90circular(
+        straight_length=1.0,
+        rows=rows,
+        cols=cols,
+        spacing=5,
+        component=gf.partial(bend_circular, radius=radius),
+    )
+
+
+def cutback_euler(radius: float, cols: int, rows: int) -> gf.Component:
+    """Cutback of euler bends."""
+    return gf.components.cutback_bend90(
+        straight_length=1.0,
+        rows=rows,
+        cols=cols,
+        spacing=5,
+        component=gf.partial(bend_euler, radius=radius),
+    )
+
+
 def test_mask_bends_circular(
     radii: Tuple[float] = radii,
     cols: Tuple[float] = cols,
@@ -34,26 +53,15 @@ def test_mask_bends_circular(
     """Bend cutbacks."""
 
     # Test structure w/ local loss calibration
-    e = []
-    for radius, column, row in zip(radii, cols, rows):
-        c = gf.components.cutback_bend90circular(
-            straight_length=1.0,
-            rows=row,
-            cols=column,
-            spacing=5,
-            component=gf.partial(bend_circular, radius=radius),
-        )
-        num_bends = c.info["n_bends"]
-
-        e += [
-            add_gc(
-                c,
-                component_name=f"bends_circular_radius_{radius:1.3f}_nbends_{num_bends}",
-                optical_routing_type=2,
-                fanout_length=1,
-                with_loopback=True,
-            )
-        ]
+    e = sweep(
+        cutback_circular,
+        zip_grid(radius=radii, cols=cols, rows=rows),
+        "bends_circular_radius_{radius:1.3f}_nbends_{n_bends}",
+        add_gc,
+        optical_routing_type=2,
+        fanout_length=1,
+        with_loopback=True,
+    )
 
     c = gf.pack(e)
     m = c[0]
@@ -71,28 +79,15 @@ def test_mask_bends_euler(
     """Bend cutbacks."""
 
     # Test structure w/ local loss calibration
-    e = []
-    for radius, column, row in zip(radii, cols, rows):
-        c = gf.components.cutback_bend90(
-            straight_length=1.0,
-            rows=row,
-            cols=column,
-            spacing=5,
-            component=gf.partial(bend_euler, radius=radius),
-        )
-        num_bends = c.info["n_bends"]
-
-        e += [
-            add_gc(
-                c,
-                component_name=f"bends_euler_radius_{radius:1.3f}_nbends_{num_bends}",
-                optical_routing_type=2,
-                with_loopback=True,
-                fanout_length=1,
-            )
-        ]
-
-        print(f"Radius: {radius}, number of bends: {num_bends}")
+    e = sweep(
+        cutback_euler,
+        zip_grid(radius=radii, cols=cols, rows=rows),
+        "bends_euler_radius_{radius:1.3f}_nbends_{n_bends}",
+        add_gc,
+        optical_routing_type=2,
+        with_loopback=True,
+        fanout_length=1,
+    )
 
     c = gf.pack(e)
     m = c[0]
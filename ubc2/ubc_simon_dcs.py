@@ -1,25 +1,26 @@
 """Sample mask for the edx course Q1 2023."""
 
-from functools import partial
 from pathlib import Path
 
 import gdsfactory as gf
+import numpy as np
 import ubcpdk
 from gdsfactory.component import Component
 from gdsfactory.components import bend_s
-from gdsfactory.components.via_stack import via_stack_heater_m3
 from gdsfactory.typings import CrossSectionSpec
 from ubcpdk.tech import LAYER
 
+from ubc2.cell_cache import disk_cache
+from ubc2.rules import MIN_RADIUS, MIN_SPACE, MIN_WIDTH, sbend_min_radius
+from ubc2.sweep import grid, sweep
 from ubc2.write_mask import size, write_mask_gds_with_metadata
 
-via_stack_heater_m3_mini = partial(via_stack_heater_m3, size=(4, 4))
-
 add_gc = ubcpdk.components.add_fiber_array
 layer_label = LAYER.TEXT
 GC_PITCH = 127
 
 
+@disk_cache
 @gf.cell
 def coupler_asymmetric_full(
     coupling_length: float = 40.0,
@@ -29,8 +30,14 @@ def coupler_asymmetric_full(
     width_top: float = 0.45,
     width_bot: float = 0.5,
     cross_section: CrossSectionSpec = "xs_sc",
+    flatten: bool = True,
     **kwargs,
 ) -> Component:
+    """Asymmetric coupler with S-bends on all ports.
+
+    With flatten=False the S-bends and the coupler stay references, so couplers
+    with the same gap and widths share their S-bend cells.
+    """
     c = gf.Component()
 
     x = gf.get_cross_section(cross_section=cross_section, **kwargs)
@@ -75,11 +82,12 @@ def coupler_asymmetric_full(
     bend_output_top.connect("o2", coupler.ports["o4"])
     bend_output_bottom.connect("o2", coupler.ports["o3"])
 
-    c.absorb(bend_input_bottom)
-    c.absorb(bend_input_top)
-    c.absorb(bend_output_top)
-    c.absorb(bend_output_bottom)
-    c.absorb(coupler)
+    if flatten:
+        c.absorb(bend_input_bottom)
+        c.absorb(bend_input_top)
+        c.absorb(bend_output_top)
+        c.absorb(bend_output_bottom)
+        c.absorb(coupler)
 
     if x.add_bbox:
         c = x.add_bbox(c)
@@ -97,6 +105,44 @@ def coupler_asymmetric_full(
     return c
 
 
+def dc(length: float, gap: float, width_top: float, width_bot: float) -> Component:
+    """Asymmetric directional coupler with tapers on all ports."""
+    return gf.add_tapers(
+        coupler_asymmetric_full(
+            coupling_length=length,
+            gap=gap,
+            width_top=width_top,
+            width_bot=width_bot,
+            flatten=False,
+        ),
+        taper=gf.components.taper,
+    )
+
+
+def min_width(width_top, width_bot, **_):
+    return np.minimum(width_top, width_bot) >= MIN_WIDTH
+
+
+# dx and dy default to those of coupler_asymmetric_full
+def sbend_offsets(gap, width_top, width_bot, dy=4.8, **_):
+    """Both S-bends move their waveguide away from the coupler."""
+    return dy - gap - np.maximum(width_top, width_bot) > 0
+
+
+def sbend_radius(gap, width_top, width_bot, dx=10.0, dy=4.8, **_):
+    """The S-bend of the wider waveguide, the sharpest, is not below MIN_RADIUS."""
+    offset = (dy - gap - np.maximum(width_top, width_bot)) / 2
+    return sbend_min_radius(dx, offset) >= MIN_RADIUS
+
+
+DC_RULES = {
+    "min_width": min_width,
+    "min_gap": lambda gap, **_: gap >= MIN_SPACE,
+    "sbend_offsets": sbend_offsets,
+    "sbend_radius": sbend_radius,
+}
+
+
 def test_mask_dcs(
     width_top: float = 0.45,
     width_bot: float = 0.5,
@@ -106,23 +152,13 @@ def test_mask_dcs(
 ) -> Path:
     """Directional couplers with different width deltas and lengths."""
 
-    e = []
-
-    e += [
-        add_gc(
-            gf.add_tapers(
-                coupler_asymmetric_full(
-                    coupling_length=length,
-                    gap=gap,
-                    width_top=width_top,
-                    width_bot=width_bot,
-                ),
-                taper=gf.components.taper,
-            ),
-            component_name=f"dc_width1_{width_top:1.3f}_width2_{width_bot:1.3f}_length_{length:1.3f}_gap_{gap:1.3f}",
-        )
-        for length in lengths
-    ]
+    e = sweep(
+        dc,
+        grid(length=lengths, gap=[gap], width_top=[width_top], width_bot=[width_bot]),
+        "dc_width1_{width_top:1.3f}_width2_{width_bot:1.3f}_length_{length:1.3f}_gap_{gap:1.3f}",
+        add_gc,
+        rules=DC_RULES,
+    )
 
     c = gf.pack(e)
     m = c[0]
@@ -159,6 +195,29 @@ test_mask_dcs_6 = gf.partial(
 )
 
 
+def test_coupler_shares_sbends() -> None:
+    import gdstk
+
+    couplers = [
+        coupler_asymmetric_full(coupling_length=length, flatten=False)
+        for length in (2, 4)
+    ]
+    bends = [
+        {id(c) for c in coupler.get_dependencies() if c.name.startswith("bend_s")}
+        for coupler in couplers
+    ]
+    assert len(bends[0]) == 4 and bends[0] == bends[1]
+
+    flat = coupler_asymmetric_full(coupling_length=2)
+    for layer in flat.layers:
+        xor = gdstk.boolean(
+            flat.get_polygons(by_spec=layer),
+            couplers[0].get_polygons(by_spec=layer),
+            "xor",
+        )
+        assert sum(p.area() for p in xor) < 1e-6
+
+
 if __name__ == "__main__":
     m = test_mask_dcs()
     # m = coupler_asymmetric_full()
@@ -1,24 +1,23 @@
 """Sample mask for the edx course Q1 2023."""
 
-import itertools
-from functools import partial
 from pathlib import Path
 
 import gdsfactory as gf
 import ubcpdk
-from gdsfactory.components.via_stack import via_stack_heater_m3
 from gdsfactory.typings import Tuple
 from ubcpdk.tech import LAYER
 
+from ubc2.cell_cache import disk_cache
+from ubc2.paths import sample_transition
+from ubc2.sweep import grid, sweep
 from ubc2.write_mask import size, write_mask_gds_with_metadata
 
-via_stack_heater_m3_mini = partial(via_stack_heater_m3, size=(4, 4))
-
 add_gc = ubcpdk.components.add_fiber_array
 layer_label = LAYER.TEXT
 GC_PITCH = 127
 
 
+@disk_cache
 @gf.cell
 def continuum_coupling(
     gap: float = 0.5,
@@ -26,7 +25,13 @@ def continuum_coupling(
     length: float = 100,
     slab_width: float = 30,
     taper_length: float = 50,
+    tolerance: float = 1e-3,
 ):
+    """Waveguide next to a slab that widens along a sine taper.
+
+    tolerance is the maximum distance in um between the tapered edges and the
+    exact sine, the taper points are placed where the slab width changes fastest.
+    """
     c = gf.Component()
 
     s0 = gf.Section(
@@ -35,6 +40,7 @@ def continuum_coupling(
         name="waveguide",
         port_names=("o1", "o2"),
         port_types=("optical", "optical"),
+        simplify=tolerance,
     )
     s1 = gf.Section(
         width=0.061,
@@ -60,7 +66,7 @@ def continuum_coupling(
     wg1 = gf.path.extrude(P1, xs1)
     wg2 = gf.path.extrude(P2, xs2)
 
-    P3 = gf.path.straight(length=taper_length, npoints=100)
+    P3 = sample_transition(Xtrans, length=taper_length, tolerance=tolerance)
     straight_transition = gf.path.extrude_transition(P3, Xtrans)
 
     wg1ref = c << wg1
@@ -98,20 +104,15 @@ def test_mask_continuum(
     """Slab of silicon close to a waveguide."""
 
     # Test structure w/ local loss calibration
-    e = []
-    for gap, width in itertools.product(gaps, widths):
-        e += [
-            add_gc(
-                continuum_coupling(
-                    gap=gap, width=width, length=length, slab_width=slab_width
-                ),
-                with_loopback=True,
-                component_name=f"continuum_gap_{gap:1.3f}_width_{width:1.3f}_length_{length:1.3f}",
-                fanout_length=30,
-                optical_routing_type=1,
-            )
-            for length in lengths
-        ]
+    e = sweep(
+        gf.partial(continuum_coupling, slab_width=slab_width),
+        grid(gap=gaps, width=widths, length=lengths),
+        "continuum_gap_{gap:1.3f}_width_{width:1.3f}_length_{length:1.3f}",
+        add_gc,
+        with_loopback=True,
+        fanout_length=30,
+        optical_routing_type=1,
+    )
 
     c = gf.pack(e)
     m = c[0]
@@ -1,24 +1,57 @@
 """Sample mask for the edx course Q1 2023."""
 
-from functools import partial
 from pathlib import Path
 
 import gdsfactory as gf
 import ubcpdk
 import ubcpdk.components as pdk
 from gdsfactory.components.bend_circular import bend_circular
-from gdsfactory.components.via_stack import via_stack_heater_m3
 from gdsfactory.typings import Tuple
 from ubcpdk.tech import LAYER, strip
 
-from ubc2.write_mask import size, write_mask_gds_with_metadata
-
-via_stack_heater_m3_mini = partial(via_stack_heater_m3, size=(4, 4))
+from ubc2.rules import MIN_RADIUS, MIN_SPACE, MIN_WIDTH
+from ubc2.sweep import grid, sweep
+from ubc2.write_mask import write_mask_dies
 
 add_gc = ubcpdk.components.add_fiber_array
 layer_label = LAYER.TEXT
 GC_PITCH = 127
 
+STRAIGHT_RULES = {"min_width": lambda width, **_: width >= MIN_WIDTH}
+RING_RULES = {
+    **STRAIGHT_RULES,
+    "min_gap": lambda gap, **_: gap >= MIN_SPACE,
+    "min_radius": lambda radius, **_: radius >= MIN_RADIUS,
+}
+
+
+def straight(width: float, radius: float) -> gf.Component:
+    """Reference straight as long as the ring coupler, with tapers on both ports."""
+    return gf.add_tapers(
+        ubcpdk.components.straight(
+            length=2 * (radius + 3),  # 3 is default ring_coupler length extension
+            cross_section=gf.partial(strip, width=width),
+        ),
+        taper=gf.components.taper,
+    )
+
+
+def ring(width: float, gap: float, radius: float) -> gf.Component:
+    """Ring with tapers on both ports."""
+    return gf.add_tapers(
+        pdk.ring_single(
+            radius=radius,
+            gap=gap,
+            length_x=0,
+            length_y=0,
+            bend=bend_circular,
+            bend_coupler=bend_circular,
+            cross_section=gf.partial(strip, width=width),
+            pass_cross_section_to_bend=True,
+        ),
+        taper=gf.components.taper,
+    )
+
 
 def test_mask_rings(
     widths: Tuple[float] = (0.3, 0.4, 0.5),
@@ -32,49 +65,22 @@ def test_mask_rings(
     e = []
 
     if with_straights:
-        e += [
-            add_gc(
-                gf.add_tapers(
-                    ubcpdk.components.straight(
-                        length=2 * (radius + 3),
-                        cross_section=gf.partial(
-                            strip, width=width
-                        ),  # 3 is default ring_coupler length extension
-                    ),
-                    taper=gf.components.taper,
-                ),
-                component_name=f"straight_width_{width:1.3f}",
-            )
-            for width in widths
-            for radius in radii
-        ]
-    e += [
-        add_gc(
-            gf.add_tapers(
-                pdk.ring_single(
-                    radius=radius,
-                    gap=gap,
-                    length_x=0,
-                    length_y=0,
-                    bend=bend_circular,
-                    bend_coupler=bend_circular,
-                    cross_section=gf.partial(strip, width=width),
-                    pass_cross_section_to_bend=True,
-                ),
-                taper=gf.components.taper,
-            ),
-            component_name=f"ring_width_{width:1.3f}_gap_{gap:1.3f}_radius_{radius:1.3f}",
+        e += sweep(
+            straight,
+            grid(width=widths, radius=radii),
+            "straight_width_{width:1.3f}",
+            add_gc,
+            rules=STRAIGHT_RULES,
         )
-        for width in widths
-        for gap in gaps
-        for radius in radii
-    ]
-
-    c = gf.pack(e, max_size=size)
-    m = c[0]
-    m.name = name
-    _ = m << gf.components.rectangle(size=size, layer=LAYER.FLOORPLAN)
-    return write_mask_gds_with_metadata(m)
+    e += sweep(
+        ring,
+        grid(width=widths, gap=gaps, radius=radii),
+        "ring_width_{width:1.3f}_gap_{gap:1.3f}_radius_{radius:1.3f}",
+        add_gc,
+        rules=RING_RULES,
+    )
+
+    return write_mask_dies(e, name, spacing=10)
 
 
 test_mask_rings_1 = gf.partial(test_mask_rings, name="EBeam_simbilod_30")
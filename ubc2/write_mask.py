@@ -1,13 +1,18 @@
 """Sample mask for the course."""
+
+import csv
 from functools import partial
 from pathlib import Path
 
 import gdsfactory as gf
+import numpy as np
 import ubcpdk
-from omegaconf import OmegaConf
 from ubcpdk.tech import LAYER
 
-from ubc2.config import PATH
+from ubc2 import packing
+from ubc2.config import PATH, get_die_name, get_mask_format
+from ubc2.metadata import SUFFIX, write_devices
+from ubc2.profiler import stage
 
 size_actives = (440, 470)
 size = (605, 410)
@@ -16,15 +21,105 @@ pack = partial(
     gf.pack, max_size=size, add_ports_prefix=False, add_ports_suffix=False, spacing=2
 )
 pack_actives = partial(pack, max_size=size_actives)
+# fewest dies of several rectpack heuristics, used by write_mask_dies
+pack_dies = partial(packing.pack, max_size=size, spacing=2)
+# CBLOCK compressed cells, with a checksum to catch truncated copies
+oasis_settings = dict(compression_level=6, validation="crc32")
+
+
+def write_labels(
+    component: gf.Component,
+    filepath: Path,
+    prefixes: tuple[str, ...] = ("opt", "elec"),
+    layer_label: tuple[int, int] = LAYER.TEXT,
+    debug: bool = False,
+) -> Path:
+    """Writes CSV with text, x, y and rotation (degrees) of the test labels.
+
+    Same output as gf.labels.write_labels.write_labels_gdstk, but reads the labels
+    from the component in memory instead of importing the written GDS again.
+
+    Args:
+        component: mask.
+        filepath: for the CSV file.
+        prefixes: for the labels to write.
+        layer_label: for the labels to write.
+        debug: prints the labels.
+    """
+    settings = gf.get_active_pdk().gds_write_settings
+    scaling = settings.unit / settings.precision
+
+    labels = [("text", "x", "y", "rotation")]
+    for label in component.get_labels(layer=layer_label):
+        if label.text.startswith(prefixes):
+            # snap to the database grid like the GDS writer (llround) does
+            origin = np.asarray(label.origin) * scaling
+            origin = np.sign(origin) * np.floor(np.abs(origin) + 0.5)
+            x, y = np.round(origin * (settings.precision / settings.unit), 3)
+            labels.append((label.text, x, y, np.rad2deg(label.rotation)))
+            if debug:
+                print(label.text)
+
+    with open(filepath, "w", newline="") as f:
+        csv.writer(f).writerows(labels)
+    return filepath
 
 
-def write_mask_gds_with_metadata(m) -> Path:
-    """Returns gdspath."""
-    gdspath = PATH.build / f"{m.name}.gds"
-    m.write_gds(gdspath=gdspath, with_metadata=True)
-    metadata_path = gdspath.with_suffix(".yml")
-    OmegaConf.load(metadata_path)
-    gf.labels.write_labels.write_labels_gdstk(
-        gdspath=gdspath, layer_label=LAYER.TEXT, debug=True
-    )
+def write_mask_gds_with_metadata(m, mask_format: str | None = None) -> Path:
+    """Writes layout, YAML metadata, device JSON Lines and CSV labels from memory.
+
+    Returns gdspath, which ends in .oas for OASIS.
+
+    Args:
+        m: mask.
+        mask_format: gds or oas. Defaults to UBC2_MASK_FORMAT, or gds.
+    """
+    mask_format = mask_format or get_mask_format()
+    gdspath = PATH.build / f"{m.name}.{mask_format}"
+    with stage("write_gds"):
+        if mask_format == "oas":
+            m.write_oas(gdspath=gdspath, **oasis_settings)
+        else:
+            m.write_gds(gdspath=gdspath)
+    with stage("write_metadata"):
+        gdspath.with_suffix(".yml").write_text(
+            m.to_yaml(with_cells=True, with_ports=True)
+        )
+    with stage("write_devices"):
+        write_devices(m, gdspath.with_suffix(SUFFIX))
+    with stage("write_labels"):
+        write_labels(m, gdspath.with_suffix(".csv"), debug=True)
     return gdspath
+
+
+def write_mask_dies(
+    components: list,
+    name: str,
+    max_size: tuple[float, float] = size,
+    spacing: float = 2,
+    max_dies: int | None = None,
+) -> Path:
+    """Packs components into dies with a floorplan and writes each die.
+
+    Devices are packed with ubc2.packing.pack, not gf.pack like `pack`. Devices
+    that do not fit the first die spill into dies named {name}b, {name}c ..., each
+    written with its own layout, metadata and labels.
+
+    Returns gdspath of the first die.
+
+    Args:
+        components: devices to place.
+        name: mask name.
+        max_size: die size.
+        spacing: between devices.
+        max_dies: raise ValueError if the devices need more dies.
+    """
+    dies = pack_dies(components, max_size=max_size, spacing=spacing)
+    if max_dies and len(dies) > max_dies:
+        raise ValueError(f"Failed to pack. It requires {len(dies)}")
+    gdspaths = []
+    for index, m in enumerate(dies):
+        m.name = get_die_name(name, index)
+        _ = m << gf.components.rectangle(size=max_size, layer=LAYER.FLOORPLAN)
+        gdspaths.append(write_mask_gds_with_metadata(m))
+    return gdspaths[0]